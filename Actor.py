@@ -1,8 +1,10 @@
 import random
+from TableStore import TableStore, EligibilityTrace
 
 class Actor:
 
-    def __init__(self, critic, decay, discount, learning_rate, epsilon, reward_func):
+    def __init__(self, critic, decay, discount, learning_rate, epsilon, reward_func, canonicalizer=None,
+                 trace_threshold=0, trace_max_length=None):
         """
         Input:
         ------
@@ -11,15 +13,16 @@ class Actor:
         discount (float): discount factor
         learning_rate (float): learning rate
         epsilon (float): epsilon. The Actor makes a random choice with probability epsilon
+        canonicalizer (SymmetryCanonicalizer): Optional. Maps states and actions to a canonical orientation
+                                               before they are used as keys, so symmetric positions share values
+        trace_threshold (float): State-action pairs with eligibility below the threshold are dropped from the trace
+        trace_max_length (int): Maximum number of state-action pairs in the eligibility trace. None for no limit
 
         Variables:
         ----------
-        state_action_values: Dictionary containing values for each state-action pair
-                                format: {([state,action]): value}}
-        eligibility: Dictionary containing the eligibility value for each state-action pair
-                                format: {([state,action]): value}}
-        visited_state_actions: List of all state-action pairs that have been visited in the current episode
-                                format: [[state, action]]
+        state_action_values: TableStore containing the value of each state-action pair.
+                                Can be used as a dictionary, format: {([state,action]): value}}
+        trace: EligibilityTrace of the state-action pairs visited in the current episode
         """
         self.critic = critic
         self.decay = decay
@@ -27,14 +30,17 @@ class Actor:
         self.epsilon = epsilon
         self.discount = discount
         self.get_reward = reward_func
+        self.canonicalizer = canonicalizer
 
-        self.state_action_values = {}
-        self.eligibility = {}
-        self.visited_state_actions = []
+        self.trace_threshold = trace_threshold
+        self.trace_max_length = trace_max_length
+
+        self.state_action_values = TableStore(pair_keys=True)
+        self.trace = self.new_episode()
 
     def get_action(self, state, legal_actions, child_states, is_greedy):
         """
-        Returns the best action for the progress of the game.
+        Returns the best action for the progress of the game, and learns from the resulting TD-error.
         This is the greedy move with probability 1-epsilon, and a random move with probability epsilon
 
         Input:
@@ -42,7 +48,39 @@ class Actor:
             legal_actions: List of the legal actions in the game at the current state
                             (in Peg Solitaire, each action is of type tuple(PSCell, int direction)
             child_states: List of states. child_states[i] is the state that occurs when legal_action[i]
-                            is performed
+                            is performed. Can also be a function child_states(action) returning the state
+                            that occurs when action is performed, so only the chosen child is built
+            is_greedy: True/False flag to force the greedy choice
+        Output:
+            action
+        """
+        best_action = self.choose_action(state, legal_actions, is_greedy)
+
+        # Defining the next state based on the best action from current state
+        if callable(child_states):
+            next_state = child_states(best_action)
+        else:
+            next_state = child_states[legal_actions.index(best_action)]
+
+        # Getting the reward of the next state from the game
+        reward = self.get_reward(next_state)
+
+        # Temporal Differencing Error
+        # The Discounted value of the TD-error calculated by the Critic
+        td_error = self.discount * self.critic.get_td_error(state_0=state, state_1=next_state, reward=reward)
+
+        self.learn(state, best_action, td_error)
+
+        return best_action
+
+    def choose_action(self, state, legal_actions, is_greedy):
+        """
+        Returns the greedy action with probability 1-epsilon, and a random action with probability epsilon.
+        Nothing is learned, see learn
+
+        Input:
+            state: The state of the surroundings
+            legal_actions: List of the legal actions in the game at the current state
             is_greedy: True/False flag to force the greedy choice
         Output:
             action
@@ -53,13 +91,16 @@ class Actor:
         best_action = None
         best_value = None
 
+        # The state and actions used as keys in the tables
+        key_state, transform = self.get_key_state(state)
+
         # Iterating through the legal actions to find the [state,action]-pair with the highest value
         for action in legal_actions:
-            key = tuple([state, action])
-            if key in self.state_action_values:
+            key_action = self.get_key_action(state, action, transform)
+            value = self.state_action_values.get_value(key_state, key_action, default=None)
+            if value is not None:
 
                 # a' <-  Pi(s') the action dictated by the current policy for state s'
-                value = self.get_value(dictionary=self.state_action_values, state=state, action=action)
                 if best_action is None or value > best_value:
                     best_value = value
                     best_action = action
@@ -70,24 +111,25 @@ class Actor:
         if best_action is None or self.epsilon > random.uniform(0, 1):
             best_action = random.choice(legal_actions)
 
-        # Defining the next state based on the best action from current state
-        next_state = child_states[legal_actions.index(best_action)]
+        return best_action
 
-        # Getting the reward of the next state from the game
-        reward = self.get_reward(next_state)
+    def learn(self, state, action, td_error):
+        """
+        Adds the state-action pair to the trace and updates the Actor based on the TD-Error
 
-        # Temporal Differencing Error
-        # The Discounted value of the TD-error calculated by the Critic
-        td_error = self.discount * self.critic.get_td_error(state_0=state, state_1=next_state, reward=reward)
+        Input:
+            state: The state the action was performed in
+            action: The performed action
+            td_error: Float. The Discounted value of the TD-error
+        """
+        key_state, transform = self.get_key_state(state)
 
-        # Adding the state-action to the list of visited [state,action]-pairs
-        self.visited_state_actions.append([state, best_action])
+        # Adding the state-action to the trace of visited [state,action]-pairs, e(s,a) <- 1
+        self.trace.visit(key_state, self.get_key_action(state, action, transform))
 
         # Updating the state-action values and eligibilities in the Actor, based on the TD-Error
         self.update_actor(td_error)
 
-        return best_action
-
     def update_actor(self, td_error):
         """
         Updating the SA-values and eligibilities in the Actor based on the TD-Error
@@ -97,39 +139,39 @@ class Actor:
 
         No Output
         """
-        # Iterating through visited SA-pairs, starting with the most recent
-
-        # e(s,a) <- 1
-        for i in range(len(self.visited_state_actions) - 1, -1, -1):
-
-            # state, actions from the i'th state-action pair
-            state = self.visited_state_actions[i][0]
-            action = self.visited_state_actions[i][1]
-
-            # e(s,a) <- 1
-            if i == len(self.visited_state_actions) - 1:
-                eligibility_value = 1
-            # e(s,a)
-            else:
-                eligibility_value = self.get_value(self.eligibility, state, action)
+        # All SA-pairs in the trace are updated at once, as array operations on the TableStore
+        # Pi(s,a) <- Pi(s,a)+ alpha*delta*e(s,a)
+        # e(s,a) <- gamma*lambda*e(s,a)
+        self.trace.update(self.learning_rate * td_error)
 
-            # Pi(s,a) <- Pi(s,a)+ alpha*delta*e(s,a)
-            state_action_value = self.get_value(self.state_action_values, state, action) \
-                                 + self.learning_rate * td_error * eligibility_value
+    def get_key_state(self, state):
+        """
+        Returns the state used as key in the tables, and the transform needed to map actions with get_key_action
 
-            self.update_value(dictionary=self.state_action_values, state=state,
-                              action=action, value=state_action_value)
+        Input:
+            state: state
+        Output:
+            key_state: state, canonicalized if the Actor has a canonicalizer
+            transform: the symmetry transform from state to key_state (None without a canonicalizer)
+        """
+        if self.canonicalizer is None:
+            return state, None
+        return self.canonicalizer.canonical_state(state)
 
-            # e(s,a) <- gamma*lambda*e(s,a)
-            self.update_value(dictionary=self.eligibility, state=state, action=action,
-                              value=self.discount * self.decay * eligibility_value)
+    def get_key_action(self, state, action, transform):
+        """
+        Returns the action used as key in the tables, given the transform returned by get_key_state(state)
+        """
+        if self.canonicalizer is None:
+            return action
+        return self.canonicalizer.canonical_action(state, action, transform)
 
     def get_value(self, dictionary, state, action):
         """
         Returning the value of the desired dictionary given key (state, action)
 
         Input:
-            dictionary: Dictionary. Either state_action_values or eligibilities
+            dictionary: Dictionary or TableStore, e.g. state_action_values
             state: state
             action: action
 
@@ -147,7 +189,7 @@ class Actor:
         Updating the value of key (state, action) in the desired dictionary
 
         Input:
-            dictionary: Dictionary. Either state_action_values or eligibilities
+            dictionary: Dictionary or TableStore, e.g. state_action_values
             state: state
             action: action
             value:  float
@@ -156,12 +198,25 @@ class Actor:
         key = tuple([state, action])
         dictionary[key] = value
 
+    def new_episode(self):
+        """
+        Returns a new, empty eligibility trace. Used to keep one trace per game when several games
+        are played at once (see set_episode)
+        """
+        return EligibilityTrace(self.state_action_values, self.discount * self.decay,
+                                threshold=self.trace_threshold, max_length=self.trace_max_length)
+
+    def set_episode(self, trace):
+        """
+        Makes the Actor continue the episode of the given trace
+        """
+        self.trace = trace
+
     def reset(self, epsilon):
         """
         Reseting eligibilities at the end of each episode
         Input:
             epsilon (float): epsilon for the next episode
         """
-        self.eligibility = {}
-        self.visited_state_actions = []
+        self.trace.reset()
         self.epsilon = epsilon
@@ -1,6 +1,7 @@
 from Actor import Actor
 from Critic import Critic
-from CriticNN import CriticNN
+from CriticNumpy import CriticNumpy
+from Symmetry import SymmetryCanonicalizer
 
 
 class CriticType:
@@ -8,16 +9,18 @@ class CriticType:
     Defines the type of Critic in the Agent
     TABLE: Table based
     NN: Neural Network based
+    NN_NUMPY: Neural Network based, on NumPy instead of TensorFlow (plain SGD only)
     """
     TABLE = 1
     NN = 2
+    NN_NUMPY = 3
 
 
 class Agent:
     def __init__(self, settings, reward_func):
         """
         settings (Settings): Settings object containing all parameters used in the Agent and its Actor and Critic:
-                 critic_type: TABLE or NN
+                 critic_type: TABLE, NN or NN_NUMPY
                  initial_epsilon: epsilon value that the Actor starts out with
 
                  dynamic_epsilon: the epsilon value that is fed to the Actor at the current episode.
@@ -31,6 +34,10 @@ class Agent:
                  nn_shape: Shape of the Neural Network
                  activation_func: Activation function for the Neural Network
                  optimizer: Optimizer for the Neural Network
+                 nn_compiled_update: Run the Neural Network end of episode update as one compiled graph call
+                 use_symmetry: Share the Actor and table Critic values between symmetric states
+                 trace_threshold: Eligibilities below this value are dropped from the traces (0 keeps all)
+                 trace_max_length: Maximum length of the eligibility traces (None for no limit)
 
         reward_func: Passing from the environment the reward function that determines reward based on the state
         """
@@ -49,28 +56,66 @@ class Agent:
         self.nn_shape = settings.nn_shape
         self.activation_func = settings.activation_func
         self.optimizer = settings.optimizer
+        self.canonicalizer = SymmetryCanonicalizer() if settings.use_symmetry else None
+        self.trace_threshold = settings.trace_threshold
+        self.trace_max_length = settings.trace_max_length
 
         if self.critic_type is CriticType.TABLE:
-            self.critic = Critic(self.decay_critic, self.discount_critic, self.l_rate_critic)
+            self.critic = Critic(self.decay_critic, self.discount_critic, self.l_rate_critic,
+                                 canonicalizer=self.canonicalizer, trace_threshold=self.trace_threshold,
+                                 trace_max_length=self.trace_max_length)
+        elif self.critic_type is CriticType.NN_NUMPY:
+            self.critic = CriticNumpy(self.decay_critic, self.discount_critic)
         else:
-            self.critic = CriticNN(self.decay_critic, self.discount_critic)
+            # TensorFlow is only imported when a CriticNN is used, so table runs start without it
+            from CriticNN import CriticNN
+            self.critic = CriticNN(self.decay_critic, self.discount_critic,
+                                   compiled_update=settings.nn_compiled_update)
 
         self.actor = Actor(critic=self.critic, decay=self.decay_actor, discount=self.discount_actor,
-                           learning_rate=self.l_rate_actor, epsilon=self.dynamic_epsilon, reward_func=reward_func)
+                           learning_rate=self.l_rate_actor, epsilon=self.dynamic_epsilon, reward_func=reward_func,
+                           canonicalizer=self.canonicalizer, trace_threshold=self.trace_threshold,
+                           trace_max_length=self.trace_max_length)
 
     def initialize_game(self, board):
-        if self.critic_type is CriticType.NN:
+        if self.critic_type is not CriticType.TABLE:
             self.critic.initialize_NN(board, self.nn_shape, self.activation_func, self.optimizer)
 
     def end_of_episode(self, episodes):
         self.reset_actor(episodes)
         self.critic.end_of_episode()
 
+    # Number of eligibility updates skipped by the bounded traces of the Actor and table Critic
+    def get_skipped_updates(self):
+        skipped = self.actor.trace.skipped_updates
+        if self.critic_type is CriticType.TABLE:
+            skipped += self.critic.trace.skipped_updates
+        return skipped
+
     def reset_actor(self, episodes):
         self.dynamic_epsilon -= (self.initial_epsilon / (episodes * self.epsilon_decay_param))
         self.dynamic_epsilon = max(0, self.dynamic_epsilon)
 
         self.actor.reset(epsilon=self.dynamic_epsilon)
 
+    # Several games played at once keep one episode each: (Actor episode, Critic episode)
+    def new_episode(self):
+        return (self.actor.new_episode(), self.critic.new_episode())
+
+    def set_episode(self, episode):
+        self.actor.set_episode(episode[0])
+        self.critic.set_episode(episode[1])
+
+    # Picks an action without learning, see learn
+    def choose_action(self, state, legal_actions, is_greedy):
+        return self.actor.choose_action(state, legal_actions, is_greedy)
+
+    # Learns from the transition from state with the action, given its TD-error from the Critic
+    def learn(self, state, action, td_error):
+        self.critic.record_td_error(state, td_error)
+        self.actor.learn(state, action, self.discount_actor * td_error)
+
+    # child_states is either a list of the child state of each legal action,
+    # or a function mapping an action to its child state (built lazily, only for the chosen action)
     def get_action(self, state, legal_actions, child_states, is_greedy):
         return self.actor.get_action(state, legal_actions, child_states, is_greedy)
@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from Agent import CriticType
+from HexGrid import Shape
+from PegSolitaire import PSBoard
+from Sweep import make_settings, seed_everything
+from main import get_agent, get_game_board, play_game
+
+
+class BenchmarkSettings:
+    """
+    Input parameters for the benchmark suite
+    """
+
+    # Boards benchmarked, each with a single empty cell (row, col)
+    shapes = [Shape.TRIANGLE, Shape.DIAMOND]
+    sizes = [4, 5, 6, 7]
+    empty_cell = {Shape.TRIANGLE: (2, 0), Shape.DIAMOND: (2, 2)}
+
+    seed = 0
+    # Every timing is repeated, and the fastest repeat is kept
+    repeats = 3
+
+    # Number of fresh interpreters started to time the startup of each critic type
+    startup_repeats = 5
+
+    # Number of positions, sampled from random games, that the move generators are timed on
+    movegen_states = 2000
+    table_episodes = 200
+    nn_episodes = 20
+
+    output_path = 'out/benchmark.json'
+    # Relative change in a metric allowed by the compare mode before it is reported as a regression
+    tolerance = 0.1
+
+
+SHAPE_NAMES = {Shape.TRIANGLE: 'triangle', Shape.DIAMOND: 'diamond'}
+CRITIC_NAMES = {CriticType.TABLE: 'table', CriticType.NN: 'nn', CriticType.NN_NUMPY: 'nn_numpy'}
+
+# Whether a larger value of the metric is better (True), worse (False), or should not change at all (None)
+METRICS = {
+    'movegen_bitboard_per_sec': True,
+    'movegen_board_per_sec': True,
+    'table_moves_per_sec': True,
+    'table_episodes_per_sec': True,
+    'nn_episodes_per_sec': True,
+    'nn_numpy_episodes_per_sec': True,
+    'table_peak_memory': False,
+    'actor_table_size': None,
+    'critic_table_size': None,
+    'startup_seconds': False,
+    'startup_max_rss': False,
+}
+
+# Run in a fresh interpreter by time_startup: builds an agent, and prints the peak memory of the process
+STARTUP_SCRIPT = '''
+import resource, sys
+from Sweep import make_settings
+from main import get_agent, get_game_board
+settings = make_settings({'critic_type': int(sys.argv[1])})
+get_agent(settings).initialize_game(get_game_board(settings))
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def get_case_settings(shape, size, critic_type, bench_settings):
+    return make_settings({'critic_type': critic_type, 'board_shape': shape, 'board_size': size,
+                          'empty_cells': [bench_settings.empty_cell[shape]], 'use_bitboard': True})
+
+
+# Positions visited by random games from the start position, the same for every run with the same seed
+def sample_states(board, n_states, seed):
+    rng = random.Random(seed)
+    start_state = board.snapshot()
+    if len(start_state.get_all_legal_moves()) == 0:
+        raise ValueError("The start position has no legal moves")
+    states = []
+    while len(states) < n_states:
+        state = start_state
+        moves = state.get_all_legal_moves()
+        while len(moves) > 0 and len(states) < n_states:
+            states.append(state)
+            state = state.move_peg(*rng.choice(moves))
+            moves = state.get_all_legal_moves()
+    return states
+
+
+# Legal moves per second on positions seen for the first time. PSBoards keep their legal moves
+# until the next move, so their caches are dropped (untimed) before every repeat
+def time_movegen(boards, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        for board in boards:
+            if isinstance(board, PSBoard):
+                board.update_remaining_pegs()
+        start = time.perf_counter()
+        for board in boards:
+            board.get_all_legal_moves()
+        best = min(best, time.perf_counter() - start)
+    return len(boards) / best
+
+
+# Trains a fresh, seeded agent and returns (time, number of moves played, agent)
+def time_training(settings, episodes, seed):
+    seed_everything(seed, settings.critic_type)
+    agent = get_agent(settings)
+    board = get_game_board(settings)
+    agent.initialize_game(board)
+    start_pegs = board.get_remaining_pegs()
+
+    # One untimed episode, so one-time costs (e.g. tracing the compiled NN functions) are not counted
+    play_game(board, agent, False, False)
+    agent.end_of_episode(episodes + 1)
+
+    n_moves = 0
+    start = time.perf_counter()
+    for _ in range(episodes):
+        n_moves += start_pegs - play_game(board, agent, False, False).get_remaining_pegs()
+        agent.end_of_episode(episodes + 1)
+    return time.perf_counter() - start, n_moves, agent
+
+
+def time_startup(critic_type, repeats):
+    """
+    Times a fresh Python process that imports the game and builds an initialized agent, as a short job does
+
+    Output:
+        Dictionary with the fastest wall time in seconds and the peak resident memory of the process in bytes
+        (as reported on Linux)
+    """
+    best_time, max_rss = float('inf'), 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, str(critic_type)],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout
+        best_time = min(best_time, time.perf_counter() - start)
+        max_rss = int(output.split()[-1]) * 1024
+    return {'critic': CRITIC_NAMES[critic_type], 'startup_seconds': best_time, 'startup_max_rss': max_rss}
+
+
+def run_case(shape, size, bench_settings, critic_types):
+    """
+    Benchmarks one board
+
+    Output:
+        Dictionary with the shape and size of the board and a value for each metric measured
+    """
+    table_settings = get_case_settings(shape, size, CriticType.TABLE, bench_settings)
+    board = get_game_board(table_settings)
+    result = {'shape': SHAPE_NAMES[shape], 'size': size}
+
+    states = sample_states(board, bench_settings.movegen_states, bench_settings.seed)
+    result['movegen_bitboard_per_sec'] = time_movegen(states, bench_settings.repeats)
+    result['movegen_board_per_sec'] = time_movegen([state.to_board() for state in states], bench_settings.repeats)
+
+    if CriticType.TABLE in critic_types:
+        episodes = bench_settings.table_episodes
+        best_time, n_moves = float('inf'), 0
+        for _ in range(bench_settings.repeats):
+            run_time, n_moves, agent = time_training(table_settings, episodes, bench_settings.seed)
+            best_time = min(best_time, run_time)
+        result['table_moves_per_sec'] = n_moves / best_time
+        result['table_episodes_per_sec'] = episodes / best_time
+        result['actor_table_size'] = len(agent.actor.state_action_values)
+        result['critic_table_size'] = len(agent.critic.value_of_states)
+
+        # Traced separately, as tracemalloc slows down the run it measures
+        tracemalloc.start()
+        time_training(table_settings, episodes, bench_settings.seed)
+        result['table_peak_memory'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    for critic_type in (CriticType.NN, CriticType.NN_NUMPY):
+        if critic_type in critic_types:
+            nn_settings = get_case_settings(shape, size, critic_type, bench_settings)
+            episodes = bench_settings.nn_episodes
+            best_time = min(time_training(nn_settings, episodes, bench_settings.seed)[0]
+                            for _ in range(bench_settings.repeats))
+            result[f'{CRITIC_NAMES[critic_type]}_episodes_per_sec'] = episodes / best_time
+    return result
+
+
+def run_benchmark(bench_settings=BenchmarkSettings,
+                  critic_types=(CriticType.TABLE, CriticType.NN, CriticType.NN_NUMPY)):
+    """
+    Runs every board of the suite and writes the results to bench_settings.output_path as JSON
+
+    Output:
+        Dictionary with the benchmark settings, the environment, a list of results, one per board,
+        and the startup results, one per critic type
+    """
+    results = []
+    for shape in bench_settings.shapes:
+        for size in bench_settings.sizes:
+            result = run_case(shape, size, bench_settings, critic_types)
+            print(SHAPE_NAMES[shape], size, ":", {metric: round(result[metric], 1) for metric in METRICS if metric in result})
+            results.append(result)
+
+    startup = []
+    for critic_type in critic_types:
+        result = time_startup(critic_type, bench_settings.startup_repeats)
+        print("startup", result['critic'], ":", {metric: round(result[metric], 3) for metric in METRICS if metric in result})
+        startup.append(result)
+
+    report = {
+        'settings': {'seed': bench_settings.seed, 'repeats': bench_settings.repeats,
+                     'movegen_states': bench_settings.movegen_states, 'table_episodes': bench_settings.table_episodes,
+                     'nn_episodes': bench_settings.nn_episodes},
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'platform': platform.platform()},
+        'results': results,
+        'startup': startup,
+    }
+    with open(bench_settings.output_path, 'w') as file:
+        json.dump(report, file, indent=2)
+    return report
+
+
+# Results of a report by case name, e.g. 'triangle 4' or 'startup table'
+def get_cases(report):
+    cases = {f"{result['shape']} {result['size']}": result for result in report['results']}
+    cases.update({f"startup {result['critic']}": result for result in report.get('startup', [])})
+    return cases
+
+
+def compare(report, baseline, tolerance):
+    """
+    Compares the metrics of a report with those of a baseline report, board by board and for the startup
+
+    Output:
+        List of (case, metric, baseline value, value) for every metric that got worse by more than
+        tolerance, or changed at all for metrics that should not change
+    """
+    baseline_cases = get_cases(baseline)
+    regressions = []
+    for case, result in get_cases(report).items():
+        baseline_result = baseline_cases.get(case)
+        if baseline_result is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in result or metric not in baseline_result:
+                continue
+            old, new = baseline_result[metric], result[metric]
+            if higher_is_better is None:
+                is_regression = new != old
+            elif higher_is_better:
+                is_regression = new < old * (1 - tolerance)
+            else:
+                is_regression = new > old * (1 + tolerance)
+            if is_regression:
+                regressions.append((case, metric, old, new))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the game engine and the training loop')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON report of an earlier run to compare with')
+    parser.add_argument('--no-nn', action='store_true', help='Skip the benchmarks of the TensorFlow NN Critic')
+    parser.add_argument('--output', default=BenchmarkSettings.output_path, help='JSON file to write the report to')
+    args = parser.parse_args()
+
+    BenchmarkSettings.output_path = args.output
+    critic_types = (CriticType.TABLE, CriticType.NN_NUMPY)
+    if not args.no_nn:
+        critic_types += (CriticType.NN,)
+    report = run_benchmark(BenchmarkSettings, critic_types)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(report, baseline, BenchmarkSettings.tolerance)
+        for (case, metric, old, new) in regressions:
+            print("Regression: ", case, metric, ": ", old, " -> ", new)
+        if len(regressions) > 0:
+            sys.exit(1)
+        print("No regressions against ", args.compare)
@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+
+from PegSolitaire import PSBitBoard
+
+
+# Checkpoints are single .npz files of plain numpy arrays:
+#   meta:                  [episode, dynamic_epsilon]
+#   actor_* / critic_*:    the TableStores of the Actor and table Critic, one row per stored entry (see save_store)
+#   nn_weight_<i>:         the weights of the CriticNN model
+# States are stored as their bitmasks (PSBitBoard) or ids (state graph), and actions as integer rows,
+# so no Python objects are pickled.
+
+
+# Encodes a list of states or actions as an integer array, and a kind telling how to decode it
+def encode_keys(keys):
+    if len(keys) == 0:
+        return 'empty', np.zeros(0, dtype=np.int64), None
+    first = keys[0]
+    if isinstance(first, PSBitBoard):
+        return 'bitboard', np.array([key.pegs for key in keys], dtype=np.uint64), (first.board_size, first.board_shape)
+    if isinstance(first, tuple):
+        return 'tuple', np.array(keys, dtype=np.int64), None
+    return 'int', np.array(keys, dtype=np.int64), None
+
+
+def decode_keys(kind, array, geometry):
+    if kind == 'bitboard':
+        (board_size, board_shape) = geometry
+        return [PSBitBoard(int(board_size), int(board_shape), int(pegs)) for pegs in array]
+    if kind == 'tuple':
+        return [tuple(int(value) for value in row) for row in array]
+    if kind == 'int':
+        return [int(value) for value in array]
+    return []
+
+
+def save_store(arrays, prefix, store):
+    states, actions, values = store.get_arrays()
+    for name, keys in (('states', states), ('actions', actions)):
+        kind, encoded, geometry = encode_keys(keys)
+        arrays[f'{prefix}_{name}'] = encoded
+        arrays[f'{prefix}_{name}_kind'] = np.array(kind)
+        arrays[f'{prefix}_{name}_geometry'] = np.array(geometry if geometry is not None else (0, 0))
+    arrays[f'{prefix}_values'] = values
+
+
+def load_store(arrays, prefix, store):
+    keys = []
+    for name in ('states', 'actions'):
+        kind = str(arrays[f'{prefix}_{name}_kind'])
+        keys.append(decode_keys(kind, arrays[f'{prefix}_{name}'], arrays[f'{prefix}_{name}_geometry']))
+    (states, actions) = keys
+    values = arrays[f'{prefix}_values']
+    if values.ndim == 2:
+        # Checkpoints of the dense layout: a (states, actions) matrix of values, flagged by a known matrix
+        (rows, columns) = np.nonzero(arrays[f'{prefix}_known'])
+        states = [states[row] for row in rows]
+        actions = [actions[column] for column in columns] if len(actions) > 0 else []
+        values = values[rows, columns]
+    store.set_arrays(states, actions, values)
+
+
+def save_checkpoint(agent, episode, path):
+    """
+    Writes the learned state of the agent to path. The file is written under a temporary name
+    and renamed when complete, so an interrupted save never leaves a broken checkpoint
+
+    Input:
+        agent: Agent, saved between episodes
+        episode: Number of episodes played
+        path: .npz file to write
+    """
+    arrays = {'meta': np.array([episode, agent.dynamic_epsilon], dtype=np.float64)}
+    save_store(arrays, 'actor', agent.actor.state_action_values)
+    if hasattr(agent.critic, 'value_of_states'):
+        save_store(arrays, 'critic', agent.critic.value_of_states)
+    else:
+        for i, weights in enumerate(agent.critic.model.get_weights()):
+            arrays[f'nn_weight_{i}'] = weights
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = path + '.tmp.npz'
+    np.savez(temporary_path, **arrays)
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(agent, path):
+    """
+    Restores an agent from a checkpoint written by save_checkpoint.
+    A CriticNN must already be initialized (Agent.initialize_game) so its weights can be set
+
+    Output:
+        Number of episodes played when the checkpoint was written
+    """
+    with np.load(path) as arrays:
+        (episode, dynamic_epsilon) = arrays['meta']
+        load_store(arrays, 'actor', agent.actor.state_action_values)
+        if 'critic_values' in arrays:
+            load_store(arrays, 'critic', agent.critic.value_of_states)
+        else:
+            n_weights = len([name for name in arrays.files if name.startswith('nn_weight_')])
+            agent.critic.model.set_weights([arrays[f'nn_weight_{i}'] for i in range(n_weights)])
+
+    # Traces of the replaced tables are discarded
+    agent.set_episode(agent.new_episode())
+    agent.dynamic_epsilon = float(dynamic_epsilon)
+    agent.actor.epsilon = agent.dynamic_epsilon
+    return int(episode)
@@ -1,30 +1,44 @@
+from TableStore import TableStore, EligibilityTrace
+
+
 class Critic:
     """
     Critic of type Table-Critic
     """
 
-    def __init__(self, decay, discount, learning_rate):
+    def __init__(self, decay, discount, learning_rate, canonicalizer=None, trace_threshold=0, trace_max_length=None):
         """
         Input:
         ------
         decay (float): The eligibility trace-decay
         discount (float): discount factor
         learning_rate (float): learning rate
+        canonicalizer (SymmetryCanonicalizer): Optional. Maps states to a canonical orientation
+                                               before they are used as keys, so symmetric states share values
+        trace_threshold (float): States with eligibility below the threshold are dropped from the trace
+        trace_max_length (int): Maximum number of states in the eligibility trace. None for no limit
 
         Variables:
         ----------
-        value_of_states: Dictionary containing values for each state, format: {state: value}}
-        eligibility: Dictionary containing the eligibility value for each state, format: {state: value}}
-        visited_states: List of all states that have been visited in the current episode, format: [state]
+        value_of_states: TableStore containing the value of each state.
+                         Can be used as a dictionary, format: {state: value}}
+        trace: EligibilityTrace of the states visited in the current episode
+        td_error_total, n_td_errors: Sum of the absolute TD-errors learned from, and their number,
+                                     since the last get_mean_td_error
         """
 
         self.decay = decay
         self.discount = discount
         self.learning_rate = learning_rate
+        self.canonicalizer = canonicalizer
+
+        self.trace_threshold = trace_threshold
+        self.trace_max_length = trace_max_length
 
-        self.value_of_states = {}
-        self.eligibility = {}
-        self.visited_states = []
+        self.value_of_states = TableStore(pair_keys=False)
+        self.trace = self.new_episode()
+        self.td_error_total = 0.0
+        self.n_td_errors = 0
     
 
     def get_td_error(self, state_0, state_1, reward):
@@ -41,13 +55,46 @@ class Critic:
         #delta <- r + gamma*V(s') - V(s)
         td_error = reward + self.discount * self.get_value_of_state(state_1) - self.get_value_of_state(state_0)
         
-        #Adding the state to the list of visited states 
-        self.visited_states.append(state_0)
+        self.record_td_error(state_0, td_error)
+        
+        return td_error
+
+    def get_td_errors(self, states_0, states_1, rewards):
+        """
+        Returns the Temporal Differencing Errors of several transitions, without learning from them
+        (see record_td_error). Used when several games are played at once
+
+        Input:
+            states_0: list of states
+            states_1: list of states, states_1[i] is the next state of states_0[i]
+            rewards: list of rewards, rewards[i] is the reward of states_1[i]
+        Output:
+            td_errors: list of floats
+        """
+        return [reward + self.discount * self.get_value_of_state(state_1) - self.get_value_of_state(state_0)
+                for (state_0, state_1, reward) in zip(states_0, states_1, rewards)]
+
+    def record_td_error(self, state_0, td_error):
+        """
+        Adds state_0 to the trace of visited states and updates the Critic based on its TD-Error
+        """
+        #Adding the state to the trace of visited states, e(s) <- 1
+        self.trace.visit(self.get_key_state(state_0))
 
         #Updating the state-values and eligibilities in the Critic, based on the TD-Error
         self.update_critic(td_error)
-        
-        return td_error
+
+        self.td_error_total += abs(td_error)
+        self.n_td_errors += 1
+
+    def get_mean_td_error(self):
+        """
+        Returns the mean absolute TD-error learned from since the last call (0 if there was none)
+        """
+        mean = self.td_error_total / self.n_td_errors if self.n_td_errors > 0 else 0.0
+        self.td_error_total = 0.0
+        self.n_td_errors = 0
+        return mean
 
     def update_critic(self, td_error):
         """
@@ -58,21 +105,10 @@ class Critic:
             
         No Output
         """
-        # e(s) <- 1
-        self.eligibility[self.visited_states[-1]] = 1
-
-        for i in range(len(self.visited_states)-1, -1, -1):
-    
-            state = self.visited_states[i]
-
-            e = self.eligibility[state]
-            
-            #V(s) <- V(s) + alpha*delta*e(s)
-            self.value_of_states[state] = self.get_value_of_state(state) + \
-                                        self.learning_rate * td_error * e
-
-            #e(s) <- gamma*lambda*e(s)
-            self.eligibility[state] = self.decay * self.discount * e
+        # All states in the trace are updated at once, as array operations on the TableStore
+        #V(s) <- V(s) + alpha*delta*e(s)
+        #e(s) <- gamma*lambda*e(s)
+        self.trace.update(self.learning_rate * td_error)
 
 
     def get_value_of_state (self, state):
@@ -86,20 +122,37 @@ class Critic:
             value: float
         """
         #all end states get value
-        if len(state.get_all_legal_moves()) == 0:
+        if state.is_terminal():
             return 0
 
-        # return self.value_of_states.get(state, 0)
-        if state in self.value_of_states:
-            return self.value_of_states[state]
-        else:
-            return 0
+        return self.value_of_states.get_value(self.get_key_state(state), default=0)
+
+    def get_key_state(self, state):
+        """
+        Returns the state used as key in the tables, canonicalized if the Critic has a canonicalizer
+        """
+        if self.canonicalizer is None:
+            return state
+        return self.canonicalizer.canonical_state(state)[0]
 
   
+    def new_episode(self):
+        """
+        Returns a new, empty eligibility trace. Used to keep one trace per game when several games
+        are played at once (see set_episode)
+        """
+        return EligibilityTrace(self.value_of_states, self.decay * self.discount,
+                                threshold=self.trace_threshold, max_length=self.trace_max_length)
+
+    def set_episode(self, trace):
+        """
+        Makes the Critic continue the episode of the given trace
+        """
+        self.trace = trace
+
     def end_of_episode(self):
         """
         Reseting eligibilities and visited_states at the end of each episode
         """
-        self.eligibility = {}
-        self.visited_states = []
+        self.trace.reset()
     
\ No newline at end of file
@@ -0,0 +1,149 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class CriticBase(ABC):
+    """
+    TD-errors and episode bookkeeping shared by the Neural Network Critics (CriticNN and CriticNumpy).
+    The visited states and their TD-errors are collected during the episode, and learned from in the
+    end_of_episode of the subclass. Subclasses evaluate a batch of encoded states in predict_encoded
+    """
+
+    def __init__(self, decay, discount):
+        """
+        Input:
+        ------
+        decay (float): The eligibility trace-decay
+        discount (float): discount factor
+
+        Variables:
+        ----------
+        visited_states: List of the encoded states visited in the current episode
+        td_errors[]: List of all TD-errors calculated during the current episode
+        cached_state, cached_value, cached_encoding: The last V(s') evaluated, with its state and encoding.
+                        The weights only change at the end of the episode, so it is reused as V(s) in the next step
+        td_error_total, n_td_errors: Sum of the absolute TD-errors learned from, and their number,
+                                     since the last get_mean_td_error
+        """
+        self.decay = decay
+        self.discount = discount
+
+        self.visited_states = []
+        self.td_errors = []
+        self.td_error_total = 0.0
+        self.n_td_errors = 0
+        self.clear_cache()
+
+    @abstractmethod
+    def predict_encoded(self, encoded):
+        """
+        Returns the values of a float32 array of encoded states of shape [k, input_size], as an array of shape [k, 1]
+        """
+
+    def clear_cache(self):
+        self.cached_state = None
+        self.cached_value = None
+        self.cached_encoding = None
+
+    def get_values(self, states):
+        """
+        Returns V(s) for a list of states, evaluated in one batched call
+
+        Input:
+            states: list of states
+        Output:
+            values: numpy array of shape [len(states)]
+        """
+        return self.predict_encoded(self.encode_states(states))[:, 0]
+
+    def get_td_error(self, state_0, state_1, reward):
+        """
+        Returns the Temporal Differencing Error, and adds state_0 and the error to the episode
+
+        Input:
+            state_0 (state): The current state of the surroundings
+            state_1 (state): The next state of the surroundings
+            reward (float): The actual reward of the next state
+        Output:
+            td_error (float): Temporal Differencing Error
+        """
+        #V(s) is reused from the previous step when state_0 was its state_1,
+        #otherwise V(s) and V(s') are evaluated together in one batched call
+        if self.cached_state is not None and state_0 == self.cached_state:
+            value_0 = self.cached_value
+            encoded_0 = self.cached_encoding
+            encoded_1 = self.encode_states([state_1])
+            value_1 = self.predict_encoded(encoded_1)[0, 0]
+        else:
+            encoded = self.encode_states([state_0, state_1])
+            values = self.predict_encoded(encoded)
+            value_0, value_1 = values[0, 0], values[1, 0]
+            encoded_0, encoded_1 = encoded[0:1], encoded[1:2]
+
+        #delta <- r + gamma*V(s') - V(s)
+        td_error = reward + self.discount * value_1 - value_0
+
+        self.cached_state = state_1
+        self.cached_value = value_1
+        self.cached_encoding = encoded_1
+
+        self.td_errors.append(td_error)
+        self.td_error_total += abs(td_error)
+        self.n_td_errors += 1
+        self.visited_states.append(encoded_0)
+        return td_error
+
+    def get_td_errors(self, states_0, states_1, rewards):
+        """
+        Returns the Temporal Differencing Errors of several transitions, without learning from them
+        (see record_td_error). All the values are evaluated in one batched call
+
+        Input:
+            states_0: list of states
+            states_1: list of states, states_1[i] is the next state of states_0[i]
+            rewards: list of rewards, rewards[i] is the reward of states_1[i]
+        Output:
+            td_errors: list of floats
+        """
+        values = self.get_values(list(states_0) + list(states_1))
+        values_0 = values[:len(states_0)]
+        values_1 = values[len(states_0):]
+        return [reward + self.discount * value_1 - value_0 for (reward, value_0, value_1) in zip(rewards, values_0, values_1)]
+
+    def record_td_error(self, state_0, td_error):
+        """
+        Adds state_0 and its TD-Error to the episode, which is learned from in end_of_episode
+        """
+        self.td_errors.append(td_error)
+        self.visited_states.append(self.encode_states([state_0]))
+        self.td_error_total += abs(td_error)
+        self.n_td_errors += 1
+
+    def get_mean_td_error(self):
+        """
+        Returns the mean absolute TD-error learned from since the last call (0 if there was none)
+        """
+        mean = self.td_error_total / self.n_td_errors if self.n_td_errors > 0 else 0.0
+        self.td_error_total = 0.0
+        self.n_td_errors = 0
+        return mean
+
+    def new_episode(self):
+        """
+        Returns a new, empty episode as [visited_states, td_errors]. Used to keep one episode per game
+        when several games are played at once (see set_episode)
+        """
+        return [[], []]
+
+    def set_episode(self, episode):
+        """
+        Makes the Critic continue the given episode, as returned by new_episode
+        """
+        self.visited_states = episode[0]
+        self.td_errors = episode[1]
+        self.clear_cache()
+
+    #Converting a list of states to a float32 array of shape [len(states), input_size]
+    def encode_states(self, states):
+        return np.array([state.one_hot_encode() for state in states], dtype=np.float32)
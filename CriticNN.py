@@ -9,35 +9,35 @@ import tensorflow.keras.callbacks as KCALL
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense
 
+from CriticBase import CriticBase
 
 
-class CriticNN:
+
+class CriticNN(CriticBase):
     """
-    Critic of type Neural Network
+    Critic of type Neural Network. The TD-errors and episodes are handled by CriticBase
     """
 
-    def __init__(self, decay, discount):
+    def __init__(self, decay, discount, compiled_update=True):
         """
         Input:
         ------
         decay (float): The eligibility trace-decay
         discount (float): discount factor
+        compiled_update (bool): Run the end of episode update as one compiled tf.function (see build_episode_update)
+                                instead of one eager GradientTape and optimizer step per visited state
 
         Variables:
         ----------
         model: tensorflow.keras.models.Sequential() neural network
-        value_of_states: Dictionary containing values for each state, format: {state: value}}
         eligibilities: List containing the eligibility value for each state, format: [value]
-        visited_states: List of all states that have been visited in the current episode, format: [state]
-        td_errors[]: List of all TD-errors calculated during the current episode
+        (and the episode variables of CriticBase)
         """
-        self.decay = decay
-        self.discount = discount
+        CriticBase.__init__(self, decay, discount)
+        self.compiled_update = compiled_update
         
         self.model = Sequential()
         self.eligibilities = []
-        self.visited_states = []
-        self.td_errors = []
         
 
     def initialize_NN(self, state, nn_shape, activation_func='relu', optimizer='Adam'):
@@ -62,37 +62,70 @@ class CriticNN:
 
         #Matching the size of the eligibilities-list with the trainable weigths
         #so that we can map each weight to its eligibility  
+        self.reset_eligibilities()
+
+        self.predict = self.build_predict(len(ohe_state))
+        if self.compiled_update:
+            self.episode_update = self.build_episode_update(len(ohe_state))
+
+    def reset_eligibilities(self):
         self.eligibilities = [0 for _ in self.model.trainable_weights]
 
+    #Compiled inference function, evaluating a batch of encoded states of shape [k, input_size] in one call
+    def build_predict(self, input_size):
+        model = self.model
+
+        @tf.function(input_signature=[tf.TensorSpec([None, input_size], tf.float32)])
+        def predict(states):
+            return model(states)
+
+        return predict
 
-    def get_td_error(self, state_0, state_1, reward):
+    def predict_encoded(self, encoded):
+        return self.predict(encoded).numpy()
+
+    def build_episode_update(self, input_size):
         """
-        Returns the Temporal Differencing Error. 
+        Builds a tf.function running the whole end of episode update in-graph.
+        The weights change after every visited state, so the gradient of each state is taken with the weights
+        left by the previous one, exactly as in the eager update. The loop over the states, the eligibility
+        recurrence and the optimizer steps all run inside one compiled graph call.
 
         Input:
-            state_0 (state): The current state of the surroundings, (in Peg Solitaire, this is the PSBoard)
-            state_0 (state): The next state of the surroundings, (in Peg Solitaire, this is the PSBoard)
-            reward (float): The actual reward of the next state
+            input_size: length of the encoded states
         Output:
-            td_error (float): Temporal Differencing Error
+            function(states, td_errors), where states is a float32 tensor of shape [T, input_size]
+            and td_errors a float32 tensor of shape [T]
         """
-        #delta <- r + gamma*V(s') - V(s)
-        td_error = reward + self.discount * self.model(self.encode_state(state_1))[0,0].numpy()- self.model(self.encode_state(state_0))[0,0].numpy()
-        # td_error = reward + self.discount * self.get_value_of_state(state_1) - self.get_value_of_state(state_0)
+        model = self.model
+        optimizer = self.model.optimizer
+        weights = self.model.trainable_weights
+        decay = self.decay
 
-        #Adding the TD-error to the list of TD-errors
-        self.td_errors.append(td_error)
+        #Optimizer slot variables (e.g. for Adam) must exist before the graph is traced
+        if hasattr(optimizer, 'build'):
+            optimizer.build(weights)
+        elif hasattr(optimizer, '_create_all_weights'):
+            optimizer._create_all_weights(weights)
 
-        #Adding the tensor-object of the state to the list of visited states
-        self.visited_states.append(self.encode_state(state_0))
+        @tf.function(input_signature=[tf.TensorSpec([None, input_size], tf.float32),
+                                      tf.TensorSpec([None], tf.float32)])
+        def episode_update(states, td_errors):
+            eligibilities = [tf.zeros_like(w) for w in weights]
+            for t in tf.range(tf.shape(states)[0]):
+                with tf.GradientTape() as g:
+                    score = model(states[t:t + 1])
+                #e_i <- e_i + d(V(s))_d(w_i)
+                gradients = g.gradient(score, weights)
+                eligibilities = [e + gradient for e, gradient in zip(eligibilities, gradients)]
 
-        return td_error
-    
-    #Converting state to tensor
-    def encode_state(self, state):
-        tensor = tf.convert_to_tensor(state.one_hot_encode())
-        tensor = tf.expand_dims(tensor, 0)
-        return tensor
+                #w_i <- w_i + alpha*delta*e_i
+                optimizer.apply_gradients(zip([e * td_errors[t] for e in eligibilities], weights))
+
+                #e_i <- lambda*e_i
+                eligibilities = [e * decay for e in eligibilities]
+
+        return episode_update
 
 
     def end_of_episode(self):
@@ -101,6 +134,15 @@ class CriticNN:
         Reseting eligibilities, td_errors and visited_states at the end
         """
 
+        if self.compiled_update:
+            if len(self.visited_states) > 0:
+                states = tf.constant(np.concatenate(self.visited_states, axis=0))
+                self.episode_update(states, tf.constant(self.td_errors, dtype=tf.float32))
+            self.visited_states = []
+            self.td_errors = []
+            self.clear_cache()
+            return
+
         #creating tuples containing each visited state and the corresponding td_error
         state_error = zip(self.visited_states, self.td_errors)
 
@@ -127,9 +169,10 @@ class CriticNN:
             self.decay_eligibilities()
 
         #Reseting eligibilities, visited_states and td_errors at the end of each episode
-        self.eligibilities = []
+        self.reset_eligibilities()
         self.visited_states = []
         self.td_errors = []
+        self.clear_cache()
         
 
     #e_i <- e_i + d(V(s))_d(w_i)
@@ -0,0 +1,185 @@
+import numpy as np
+
+from CriticBase import CriticBase
+
+
+# Activation functions as (f(z), f'(z) given z and h = f(z)), named as the built-in Keras activations
+ACTIVATIONS = {
+    'linear': (lambda z: z, lambda z, h: np.ones_like(z)),
+    'relu': (lambda z: np.maximum(z, 0), lambda z, h: (z > 0).astype(z.dtype)),
+    'sigmoid': (lambda z: 1 / (1 + np.exp(-z)), lambda z, h: h * (1 - h)),
+    'tanh': (np.tanh, lambda z, h: 1 - h * h),
+    'elu': (lambda z: np.where(z > 0, z, np.expm1(np.minimum(z, 0))), lambda z, h: np.where(z > 0, 1, h + 1)),
+    'softplus': (lambda z: np.logaddexp(z, 0), lambda z, h: 1 / (1 + np.exp(-z))),
+}
+
+# Learning rate of plain SGD, the default of the Keras 'SGD' optimizer used by CriticNN
+SGD_LEARNING_RATE = 0.01
+
+
+class NumpyMLP:
+    """
+    Small fully connected network with hand-written forward and backward passes.
+    Built like the Keras Sequential model of CriticNN: Dense layers with the same activation,
+    Glorot uniform weights and zero biases, and weights ordered [W_0, b_0, W_1, b_1, ...] by get_weights
+
+    Input:
+    ------
+    input_size (int): Length of the input
+    nn_shape (list): Size of each layer, the last one being the output
+    activation_func (str): Name of the activation function, see ACTIVATIONS
+    learning_rate (float): Learning rate of the SGD steps of fit
+    """
+
+    def __init__(self, input_size, nn_shape, activation_func='relu', learning_rate=SGD_LEARNING_RATE):
+        if activation_func not in ACTIVATIONS:
+            raise ValueError(f"Unknown activation function: {activation_func}")
+        self.activation, self.derivative = ACTIVATIONS[activation_func]
+        self.learning_rate = learning_rate
+
+        self.weights = []
+        fan_in = input_size
+        for fan_out in nn_shape:
+            limit = np.sqrt(6 / (fan_in + fan_out))
+            self.weights.append(np.random.uniform(-limit, limit, (fan_in, fan_out)).astype(np.float32))
+            self.weights.append(np.zeros(fan_out, dtype=np.float32))
+            fan_in = fan_out
+
+    def get_weights(self):
+        return [w.copy() for w in self.weights]
+
+    def set_weights(self, weights):
+        for w, value in zip(self.weights, weights):
+            w[...] = value
+
+    def forward(self, x):
+        """
+        Returns the output for a batch x of shape [k, input_size], and the (input, pre-activation, output)
+        of every layer, used by gradients
+        """
+        layers = []
+        h = x
+        for i in range(0, len(self.weights), 2):
+            z = h @ self.weights[i] + self.weights[i + 1]
+            h_next = self.activation(z)
+            layers.append((h, z, h_next))
+            h = h_next
+        return h, layers
+
+    def gradients(self, layers, output_gradients):
+        """
+        Backward pass: returns the gradients of sum(output_gradients * output) over the batch, for every weight
+
+        Input:
+            layers: As returned by forward
+            output_gradients: Array of shape [k, output size]
+        """
+        gradients = [None] * len(self.weights)
+        delta = output_gradients
+        for layer in range(len(layers) - 1, -1, -1):
+            (h, z, h_next) = layers[layer]
+            delta = delta * self.derivative(z, h_next)
+            gradients[2 * layer] = h.T @ delta
+            gradients[2 * layer + 1] = delta.sum(axis=0)
+            delta = delta @ self.weights[2 * layer].T
+        return gradients
+
+    def predict(self, x):
+        return self.forward(x)[0]
+
+    def fit(self, x, y, epochs=1, batch_size=32, verbose=0):
+        """
+        Fits the network to the targets y with the mean squared error and plain SGD, in shuffled mini-batches
+        (as Keras Model.fit). verbose is accepted for compatibility and ignored
+        """
+        y = np.asarray(y, dtype=np.float32).reshape(len(y), -1)
+        for _ in range(epochs):
+            order = np.random.permutation(len(x))
+            for start in range(0, len(x), batch_size):
+                batch = order[start:start + batch_size]
+                output, layers = self.forward(x[batch])
+                gradients = self.gradients(layers, 2 * (output - y[batch]) / output.size)
+                for w, gradient in zip(self.weights, gradients):
+                    w -= self.learning_rate * gradient
+
+
+class CriticNumpy(CriticBase):
+    """
+    Critic of type Neural Network, on a NumPy network instead of TensorFlow.
+    Same interface and same end of episode update as CriticNN with the 'SGD' optimizer, without the
+    TensorFlow dispatch overhead that dominates the cost of the small networks used here.
+    The TD-errors and episodes are handled by CriticBase
+    """
+
+    def __init__(self, decay, discount):
+        """
+        Input:
+        ------
+        decay (float): The eligibility trace-decay
+        discount (float): discount factor
+
+        Variables:
+        ----------
+        model: NumpyMLP neural network
+        eligibilities: One array per weight of the model, allocated once and zeroed between episodes
+        step: One array per weight of the model, for the weight updates
+        (and the episode variables of CriticBase)
+        """
+        CriticBase.__init__(self, decay, discount)
+
+        self.model = None
+        self.eligibilities = []
+        self.step = []
+
+    def initialize_NN(self, state, nn_shape, activation_func='relu', optimizer='SGD'):
+        """
+        Initializing the Neural Network Model
+
+        Input:
+            state: the board of the game, used to define the size of the input layer
+            nn_shape: List containing the integer size of the layers in the NN
+            activation_function: name of the activation function, see ACTIVATIONS
+            optimizer: only 'SGD' is supported
+        """
+        if optimizer != 'SGD':
+            raise ValueError(f"CriticNumpy only supports the 'SGD' optimizer, not {optimizer}")
+        self.model = NumpyMLP(len(state.one_hot_encode()), nn_shape, activation_func)
+        self.eligibilities = [np.zeros_like(w) for w in self.model.weights]
+        self.step = [np.zeros_like(w) for w in self.model.weights]
+
+    def reset_eligibilities(self):
+        for e in self.eligibilities:
+            e.fill(0)
+
+    def predict_encoded(self, encoded):
+        return self.model.predict(encoded)
+
+    def end_of_episode(self):
+        """
+        Updates the Neural Network based on the visited states and their td_errors in the entire episode,
+        in order, each gradient taken with the weights left by the previous state (as CriticNN).
+        Reseting eligibilities, td_errors and visited_states at the end
+        """
+        weights = self.model.weights
+        output_gradient = np.ones((1, 1), dtype=np.float32)
+        learning_rate = np.float32(self.model.learning_rate)
+
+        for (state, td_error) in zip(self.visited_states, self.td_errors):
+            _, layers = self.model.forward(state)
+            gradients = self.model.gradients(layers, output_gradient)
+
+            step_size = learning_rate * np.float32(td_error)
+            for w, e, step, gradient in zip(weights, self.eligibilities, self.step, gradients):
+                #e_i <- e_i + d(V(s))_d(w_i)
+                e += gradient
+                #The eligibilities are applied as the gradient of an SGD step, as by the optimizer of CriticNN:
+                #w_i <- w_i - alpha*delta*e_i
+                np.multiply(e, step_size, out=step)
+                w -= step
+                #e_i <- lambda*e_i
+                e *= self.decay
+
+        self.reset_eligibilities()
+        self.visited_states = []
+        self.td_errors = []
+        self.clear_cache()
@@ -0,0 +1,134 @@
+import argparse
+import itertools
+import random
+import time
+
+from Agent import CriticType
+from Checkpoint import load_checkpoint
+from HexGrid import get_topology
+from Sweep import make_pool, make_settings, write_results
+from main import Settings, get_agent, get_game_board, play_game
+
+
+class EvaluationSettings:
+    """
+    Input parameters for the greedy evaluation of a trained agent over many start positions
+    """
+
+    # Checkpoint of the agent (see Checkpoint.py), and the Settings fields it was trained with.
+    # The critic type, network shape and use_symmetry must match the checkpoint (see make_pool)
+    checkpoint_path = Settings.checkpoint_path
+    fixed_settings = {'critic_type': CriticType.TABLE}
+
+    # Every start position with n_holes empty cells on the board of Settings.board_shape and board_size is played
+    n_holes = 1
+    seed = 0
+
+    # Number of worker processes (None for all cores), and number of start positions sent to a worker at once
+    n_workers = None
+    chunksize = 16
+    output_path = 'out/evaluation.csv'
+
+
+# Every start position with n_holes empty cells, as lists of (row, col), in a fixed order
+def get_start_positions(board_size, board_shape, n_holes):
+    positions = get_topology(board_size, board_shape).positions[1:]
+    return [list(empty_cells) for empty_cells in itertools.combinations(positions, n_holes)]
+
+
+# The agent of a worker process, loaded once by init_worker and only read by evaluate_start
+_worker_agent = None
+_worker_settings = None
+
+
+def init_worker(configuration, checkpoint_path):
+    """
+    Loads the agent of the checkpoint in a worker process. The tables are made read-only, so nothing
+    can be learned from the evaluation games
+    """
+    global _worker_agent, _worker_settings
+    _worker_settings = make_settings(configuration)
+    _worker_agent = get_agent(_worker_settings)
+    _worker_agent.initialize_game(get_game_board(_worker_settings))
+    load_checkpoint(_worker_agent, checkpoint_path)
+
+    _worker_agent.actor.state_action_values.set_read_only()
+    if hasattr(_worker_agent.critic, 'value_of_states'):
+        _worker_agent.critic.value_of_states.set_read_only()
+
+
+def evaluate_start(task):
+    """
+    Plays a greedy game from one start position with the agent of the worker, without learning
+
+    Input:
+        task: (index of the start position, list of its empty cells, seed of the random moves
+               the Actor makes in states it does not know)
+    Output:
+        Dictionary with the outcome of the game
+    """
+    (index, empty_cells, seed) = task
+    _worker_settings.empty_cells = empty_cells
+    board = get_game_board(_worker_settings)
+    start_pegs = board.get_remaining_pegs()
+    random.seed(seed)
+
+    start = time.perf_counter()
+    has_moves = len(board.get_all_legal_moves()) > 0
+    final_state = play_game(board, _worker_agent, is_greedy=True, visualize=False, learn=False)
+    latency = time.perf_counter() - start
+
+    remaining_pegs = final_state.get_remaining_pegs()
+    return {'start': index,
+            'empty_cells': ' '.join(f'{row},{col}' for (row, col) in empty_cells),
+            'has_moves': has_moves,
+            'remaining_pegs': remaining_pegs,
+            'win': remaining_pegs == 1,
+            'moves': start_pegs - remaining_pegs,
+            'latency_ms': latency * 1000}
+
+
+def run_evaluation(evaluation_settings=EvaluationSettings):
+    """
+    Plays a greedy game from every start position in a process pool, and writes a row per start
+    position to evaluation_settings.output_path
+
+    Output:
+        List of result rows, in the order of get_start_positions
+    """
+    configuration = dict(evaluation_settings.fixed_settings)
+    settings = make_settings(configuration)
+    starts = get_start_positions(settings.board_size, settings.board_shape, evaluation_settings.n_holes)
+    tasks = [(i, empty_cells, evaluation_settings.seed * 100003 + i) for i, empty_cells in enumerate(starts)]
+
+    start = time.time()
+    with make_pool(evaluation_settings.n_workers, initializer=init_worker,
+                   initargs=(configuration, evaluation_settings.checkpoint_path)) as pool:
+        rows = list(pool.map(evaluate_start, tasks, chunksize=evaluation_settings.chunksize))
+    elapsed = time.time() - start
+
+    playable = [row for row in rows if row['has_moves']]
+    wins = sum(row['win'] for row in playable)
+    print("Evaluated ", len(rows), " start positions (", len(playable), " with legal moves) in ", round(elapsed, 3), "s")
+    if len(playable) > 0:
+        print("Wins: ", wins, " of ", len(playable), ", mean remaining pegs: ",
+              round(sum(row['remaining_pegs'] for row in playable) / len(playable), 3),
+              ", mean latency: ", round(sum(row['latency_ms'] for row in playable) / len(playable), 3), "ms")
+
+    write_results(rows, evaluation_settings.output_path)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Plays greedy games of a trained agent from every start position')
+    parser.add_argument('--checkpoint', default=EvaluationSettings.checkpoint_path, help='Checkpoint of the agent')
+    parser.add_argument('--holes', type=int, default=EvaluationSettings.n_holes, help='Number of empty cells at the start')
+    parser.add_argument('--workers', type=int, default=EvaluationSettings.n_workers, help='Number of worker processes')
+    parser.add_argument('--output', default=EvaluationSettings.output_path, help='CSV file to write the results to')
+    args = parser.parse_args()
+
+    EvaluationSettings.checkpoint_path = args.checkpoint
+    EvaluationSettings.n_holes = args.holes
+    EvaluationSettings.n_workers = args.workers
+    EvaluationSettings.output_path = args.output
+    run_evaluation()
@@ -33,59 +33,114 @@ class Cell:
         return self.nametag
 
 
-class HexGrid:
+class HexTopology:
+    """
+    Immutable geometry of a board of a given shape and size, shared by all boards with that geometry.
+    Cells are referred to by their nametags, numbered from 1 in row-major order.
+
+    positions: positions[nametag] is the (row, col) of the cell in the board matrix
+    nametags: {(row, col): nametag}
+    neighbors: neighbors[nametag] is a tuple of the neighbouring nametags (or None) in
+               the directions [n, e, se, s, w, nw] = [0,1,2,3,4,5]
+    jumps: Every possible jump as a tuple (from, over, to, direction) of nametags, ordered by
+           the nametag of the jumping peg and then by direction
+    jump_indices: {(from, direction): index of the jump in jumps}
+    jumps_touching: jumps_touching[nametag] is the tuple of the indices of the jumps that use the cell,
+                    as the jumping peg, the jumped peg or the target. Only these can change legality
+                    when the cell is populated or emptied
+    jumps_affected: jumps_affected[index] is the tuple of the indices of the jumps that use any cell of jump index,
+                    the only jumps that can change legality when it is made or undone
+    """
+
+    # Offsets in the board matrix for the directions [n, e, se, s, w, nw] = [0,1,2,3,4,5]
+    direction_steps = ((-1, 0), (0, 1), (1, 1), (1, 0), (0, -1), (-1, -1))
+
     def __init__(self, board_size, board_shape):
         self.board_size = board_size
         self.board_shape = board_shape
-        populated_board = self.populate_board(Cell)
-        self.board = self.assign_neighbors(populated_board)
 
-    def populate_board(self, cell_type):
-        board = np.empty((self.board_size, self.board_size), dtype='O')
-        nametag_counter = 1
-
-        for i in range(self.board_size):
-            if self.board_shape == Shape.DIAMOND:
-                for j in range(self.board_size):
-                    board[i, j] = cell_type(nametag_counter)
-                    nametag_counter += 1
-            elif self.board_shape == Shape.TRIANGLE:
-                for j in range(i + 1):
-                    board[i, j] = cell_type(nametag_counter)
-                    nametag_counter += 1
-        return board
+        positions = [None]
+        for i in range(board_size):
+            # Diamond boards fill the whole matrix, triangle boards the lower-left half
+            row_length = board_size if board_shape == Shape.DIAMOND else i + 1
+            for j in range(row_length):
+                positions.append((i, j))
+        self.positions = tuple(positions)
+        self.nametags = {position: nametag for nametag, position in enumerate(self.positions) if nametag > 0}
+        self.size = len(self.positions) - 1
 
+        neighbors = [None]
+        for (i, j) in self.positions[1:]:
+            neighbors.append(tuple(self.nametags.get((i + di, j + dj)) for (di, dj) in self.direction_steps))
+        self.neighbors = tuple(neighbors)
 
-    def assign_neighbors(self, board):
-        for i in range(len(board)):
-            for j in range(len(board[i])):
+        jumps = []
+        for nametag in range(1, self.size + 1):
+            for direction in range(len(self.direction_steps)):
+                over = self.neighbors[nametag][direction]
+                if over is not None and self.neighbors[over][direction] is not None:
+                    jumps.append((nametag, over, self.neighbors[over][direction], direction))
+        self.jumps = tuple(jumps)
+        self.jump_indices = {(jump[0], jump[3]): index for index, jump in enumerate(self.jumps)}
+
+        jumps_touching = [[] for _ in self.positions]
+        for index, (origin, over, target, _) in enumerate(self.jumps):
+            for nametag in (origin, over, target):
+                jumps_touching[nametag].append(index)
+        self.jumps_touching = tuple(tuple(indices) for indices in jumps_touching)
+        self.jumps_affected = tuple(tuple(sorted(set(jumps_touching[origin] + jumps_touching[over] + jumps_touching[target])))
+                                    for (origin, over, target, _) in self.jumps)
+
+    # The topology is immutable, so copies of a board can keep sharing it
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
-                # continue to next loop iteration if cell is None
-                # Only used when Board shape is TRIANGLE, as the cells in the matrix not used by the triangle is None
-                if board[i][j] is None:
-                    continue
+    def get_position(self, nametag):
+        return self.positions[nametag]
 
-                # north, east, southeast, south, southwest, northwest
-                n = e = se = s = w = nw = None
+    def get_nametag(self, row, col):
+        return self.nametags[(row, col)]
 
 
-                if i > 0:
-                    n = board[i - 1][j]
+_topologies = {}
 
-                if j < len(board[i]) - 1:
-                    e = board[i][j + 1]
-                    if i < len(board[i]) - 1:
-                        se = board[i + 1][j + 1]
 
-                if i < len(board[i]) - 1:
-                    s = board[i + 1][j]
+# Returns the shared topology for boards of the given size and shape
+def get_topology(board_size, board_shape):
+    key = (board_size, board_shape)
+    if key not in _topologies:
+        _topologies[key] = HexTopology(board_size, board_shape)
+    return _topologies[key]
 
-                if j > 0:
-                    w = board[i][j - 1]
-                    if i > 0:
-                        nw = board[i - 1][j - 1]
 
-                board[i][j].neighbors = [n, e, se, s, w, nw]
+class HexGrid:
+    def __init__(self, board_size, board_shape, cell_type=Cell):
+        self.board_size = board_size
+        self.board_shape = board_shape
+        self.topology = get_topology(board_size, board_shape)
+        populated_board = self.populate_board(cell_type)
+        self.board = self.assign_neighbors(populated_board)
+
+    def populate_board(self, cell_type):
+        board = np.empty((self.board_size, self.board_size), dtype='O')
+        # cells[nametag] is the cell with that nametag, for O(1) lookup
+        self.cells = [None]
+        for nametag in range(1, self.topology.size + 1):
+            cell = cell_type(nametag)
+            board[self.topology.get_position(nametag)] = cell
+            self.cells.append(cell)
+        return board
+
+    # Links each cell to its neighbours [n, e, se, s, w, nw], using the precomputed topology
+    def assign_neighbors(self, board):
+        for nametag, neighbor_tags in enumerate(self.topology.neighbors):
+            if nametag == 0:
+                continue
+            cell = board[self.topology.get_position(nametag)]
+            cell.neighbors = [None if tag is None else board[self.topology.get_position(tag)] for tag in neighbor_tags]
         return board
 
     def visualize(self, output_path):
@@ -1,6 +1,6 @@
+import math
+
 from PIL import Image, ImageDraw
-import matplotlib.image as mpimg
-import matplotlib.pyplot as plt
 
 class Styles:
     WHITE = (255, 255, 255)
@@ -86,12 +86,126 @@ class HexVizualizer:
         image.save(output_path)
 
         # Display image in Jupyter Notebook by using matplotlib.image
+        import matplotlib.image as mpimg
+        import matplotlib.pyplot as plt
         img = mpimg.imread(output_path)
         imgplot = plt.imshow(img)
         imgplot.axes.get_xaxis().set_visible(False)
         imgplot.axes.get_yaxis().set_visible(False)
 
 
+class FrameRenderer:
+    """
+    Renders the frames of a game in memory, drawing the same picture as HexVizualizer.
+
+    The lines of the grid are drawn once per board topology and cached (see get_static_layer).
+    Every frame starts from the previous one, and only the cells that changed since then are redrawn.
+
+    Input:
+    ------
+    board_size (int): Size of the board
+    board_shape (Shape): Shape of the board
+    """
+
+    def __init__(self, board_size, board_shape):
+        self.layer, self.cell_coordinates = get_static_layer(board_size, board_shape)
+        self.frame = None
+        self.pegs = None
+
+    def render(self, board):
+        """
+        Returns the frame of a board (PSBoard or PSBitBoard) as a PIL image.
+        The image is reused by the next call, so it must be copied or encoded before then
+        """
+        state = board.snapshot()
+        if self.frame is None:
+            self.frame = self.layer.copy()
+            changed = state.layout.valid_mask
+        else:
+            changed = self.pegs ^ state.pegs
+        canvas = ImageDraw.Draw(self.frame)
+
+        # Only the set bits of changed, i.e. the cells that gained or lost a peg
+        while changed:
+            bit = (changed & -changed).bit_length() - 1
+            changed &= changed - 1
+            nametag = state.layout.nametags[bit]
+            if state.is_populated(nametag):
+                occupied_cell(canvas, self.cell_coordinates[nametag])
+            else:
+                empty_cell(canvas, self.cell_coordinates[nametag])
+
+        self.pegs = state.pegs
+        return self.frame
+
+
+_static_layers = {}
+
+
+def get_static_layer(board_size, board_shape):
+    """
+    Returns the image of the grid lines of a board, and the (x, y) centre of every cell in the image
+    (indexed by nametag), in the final, rotated frame. Shared by all renderers of the same topology
+    """
+    # Imported here, as HexGrid imports this module
+    from HexGrid import Shape, get_topology
+
+    key = (board_size, board_shape)
+    if key not in _static_layers:
+        topology = get_topology(board_size, board_shape)
+        image_dimentions = (board_size - 1) * Styles.CELLMARGIN + 2 * Styles.PADDING
+        image_centre = image_dimentions / 2
+
+        # Same layout as HexVizualizer.get_node_coordinates: the cells of each row are centred horizontally
+        rows = {}
+        for position in topology.positions[1:]:
+            rows.setdefault(position[0], []).append(position)
+        coordinates = {}
+        for i, row in rows.items():
+            row.sort()
+            row_start = image_centre - (len(row) - 1) * Styles.CELLMARGIN / 2
+            for j, position in enumerate(row):
+                coordinates[position] = (row_start + j * Styles.CELLMARGIN, i * Styles.CELLMARGIN + Styles.PADDING)
+        grid = [[(None, *coordinates[position]) for position in rows[row]] for row in sorted(rows)]
+
+        image = create_image(image_dimentions, image_dimentions)
+        render_lines(grid, ImageDraw.Draw(image))
+
+        #Diamond boards are rendered as a square and rotated 45deg
+        rotation = 45 if board_shape == Shape.DIAMOND else 0
+        if rotation != 0:
+            image = image.rotate(rotation, Image.NEAREST, expand=1, fillcolor=Styles.WHITE)
+
+        # The cells are drawn on the rotated image, so their centres are rotated the same way as the image
+        angle = math.radians(rotation)
+        (width, height) = image.size
+        cell_centres = [None]
+        for position in topology.positions[1:]:
+            (x, y) = coordinates[position]
+            dx, dy = x - image_centre, y - image_centre
+            cell_centres.append([width / 2 + dx * math.cos(angle) + dy * math.sin(angle),
+                                 height / 2 - dx * math.sin(angle) + dy * math.cos(angle)])
+        _static_layers[key] = (image, cell_centres)
+    return _static_layers[key]
+
+
+def save_gif(boards, output_path, duration):
+    """
+    Renders a game with a FrameRenderer and streams the frames into a GIF, without writing any other files.
+    The board is drawn in black and white, so the frames are encoded as grayscale, which needs no color quantization
+
+    Input:
+        boards: List of boards (PSBoard or PSBitBoard), one per frame
+        output_path: GIF file to write
+        duration: Time in seconds each frame is shown
+    """
+    renderer = FrameRenderer(boards[0].get_boardsize(), boards[0].snapshot().board_shape)
+    frames = (renderer.render(board).convert('L') for board in boards)
+    first_frame = next(frames)
+    first_frame.save(output_path, save_all=True, append_images=frames, duration=int(duration * 1000), loop=0,
+                     optimize=False)
+
+
 def render_lines(cell_coordinates, canvas):
     for i in range(len(cell_coordinates)):
             for j in range(len(cell_coordinates[i])):
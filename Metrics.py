@@ -0,0 +1,187 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+
+# Columns of the metrics log, one record per episode:
+#   episode:            Number of the episode, from 1
+#   remaining_pegs:     Pegs left at the end of the episode
+#   steps:              Number of moves played
+#   time:               Wall time of the episode in seconds
+#   epsilon:            Exploration rate of the Actor during the episode
+#   actor_table_size:   Number of state-action pairs in the Actor
+#   critic_table_size:  Number of states in the table Critic (-1 for the NN Critics)
+#   mean_td_error:      Mean absolute TD-error learned from during the episode
+COLUMNS = [
+    ('episode', np.int32),
+    ('remaining_pegs', np.int16),
+    ('steps', np.int16),
+    ('time', np.float64),
+    ('epsilon', np.float32),
+    ('actor_table_size', np.int64),
+    ('critic_table_size', np.int64),
+    ('mean_td_error', np.float32),
+]
+
+
+class MetricsLog:
+    """
+    Append-only, columnar log of per-episode metrics: a directory with one raw binary file per column.
+    Records are buffered in preallocated arrays and written in batches of flush_every records, so logging
+    costs a few array stores per episode, and a crash loses at most the records of the last batch
+
+    Input:
+    ------
+    path (str): Directory of the log
+    flush_every (int): Number of records buffered before they are written
+    first_episode (int): Number of episodes already played, when resuming from a checkpoint. The records of
+                         later episodes, written before the checkpoint was restored, are dropped.
+                         0 starts a new log
+    """
+
+    def __init__(self, path, flush_every=100, first_episode=0):
+        self.path = path
+        self.flush_every = flush_every
+        self.buffers = {name: np.zeros(flush_every, dtype=dtype) for name, dtype in COLUMNS}
+        self.n_buffered = 0
+
+        os.makedirs(path, exist_ok=True)
+        n_kept = 0
+        if first_episode > 0:
+            episodes = read_metrics(path)['episode']
+            n_kept = int(np.searchsorted(episodes, first_episode, side='right'))
+        for name, dtype in COLUMNS:
+            with open(self.get_column_path(name), 'ab') as file:
+                file.truncate(n_kept * np.dtype(dtype).itemsize)
+
+    def get_column_path(self, name):
+        return os.path.join(self.path, name + '.bin')
+
+    def record(self, agent, episode, remaining_pegs, steps, episode_time):
+        """
+        Adds the record of a finished episode, with the epsilon, table sizes and TD-errors read from the agent.
+        Called before Agent.end_of_episode, which changes epsilon
+        """
+        i = self.n_buffered
+        buffers = self.buffers
+        buffers['episode'][i] = episode
+        buffers['remaining_pegs'][i] = remaining_pegs
+        buffers['steps'][i] = steps
+        buffers['time'][i] = episode_time
+        buffers['epsilon'][i] = agent.dynamic_epsilon
+        buffers['actor_table_size'][i] = len(agent.actor.state_action_values)
+        buffers['critic_table_size'][i] = len(agent.critic.value_of_states) if hasattr(agent.critic, 'value_of_states') else -1
+        buffers['mean_td_error'][i] = agent.critic.get_mean_td_error()
+        self.n_buffered += 1
+        if self.n_buffered == self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Appends the buffered records to the column files
+        """
+        if self.n_buffered == 0:
+            return
+        for name, buffer in self.buffers.items():
+            with open(self.get_column_path(name), 'ab') as file:
+                file.write(buffer[:self.n_buffered].tobytes())
+        self.n_buffered = 0
+
+    def close(self):
+        self.flush()
+
+
+def read_metrics(path, columns=None):
+    """
+    Reads the columns of a metrics log, while it is being written or after a crash.
+    Columns are cut to the number of records complete in all of them
+
+    Input:
+        path: Directory of the log
+        columns: List of column names to read, None for all
+    Output:
+        Dictionary {column name: numpy array}
+    """
+    dtypes = dict(COLUMNS)
+    names = columns if columns is not None else list(dtypes)
+    # The episode column is always read, to find the number of complete records
+    lengths = []
+    for name in set(names) | {'episode'}:
+        column_path = os.path.join(path, name + '.bin')
+        size = os.path.getsize(column_path) if os.path.exists(column_path) else 0
+        lengths.append(size // np.dtype(dtypes[name]).itemsize)
+    n_records = min(lengths)
+    return {name: np.fromfile(os.path.join(path, name + '.bin'), dtype=dtypes[name], count=n_records)
+            if n_records > 0 else np.zeros(0, dtype=dtypes[name]) for name in names}
+
+
+def plot_metrics(path, output_path, window=50):
+    """
+    Plots the learning curve of a metrics log: the remaining pegs of every episode, their moving average
+    over window episodes, and the mean TD-error
+    """
+    import matplotlib.pyplot as plt
+
+    metrics = read_metrics(path, ['episode', 'remaining_pegs', 'mean_td_error'])
+    episodes = metrics['episode']
+    pegs = metrics['remaining_pegs'].astype(np.float64)
+
+    figure, (pegs_axis, td_axis) = plt.subplots(2, 1, sharex=True, figsize=(8, 6))
+    pegs_axis.plot(episodes, pegs, '.', markersize=2, alpha=0.4)
+    if len(pegs) >= window:
+        moving_average = np.convolve(pegs, np.ones(window) / window, mode='valid')
+        pegs_axis.plot(episodes[window - 1:], moving_average)
+    pegs_axis.set_ylabel('Nr of remaining pegs')
+    td_axis.plot(episodes, metrics['mean_td_error'])
+    td_axis.set_xlabel('Episode')
+    td_axis.set_ylabel('Mean |TD-error|')
+    figure.savefig(output_path)
+    plt.close(figure)
+
+
+class RateLimitedPlotter:
+    """
+    Redraws the plot of a metrics log when new records have been written, at most once every min_interval seconds.
+    Meant to run in its own process (see __main__), so the training run never waits for it
+    """
+
+    def __init__(self, path, output_path, min_interval=10):
+        self.path = path
+        self.output_path = output_path
+        self.min_interval = min_interval
+        self.last_plot = -float('inf')
+        self.last_size = -1
+
+    def update(self):
+        """
+        Returns True if the plot was redrawn
+        """
+        now = time.time()
+        episode_path = os.path.join(self.path, 'episode.bin')
+        size = os.path.getsize(episode_path) if os.path.exists(episode_path) else 0
+        if now - self.last_plot < self.min_interval or size == self.last_size or size == 0:
+            return False
+        plot_metrics(self.path, self.output_path)
+        self.last_plot = now
+        self.last_size = size
+        return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Plots the metrics log of a training run while it is written')
+    parser.add_argument('path', nargs='?', default='out/metrics', help='Directory of the metrics log')
+    parser.add_argument('--output', default='out/plot.png', help='Image file to write')
+    parser.add_argument('--every', type=float, default=10, help='Minimum number of seconds between plots')
+    parser.add_argument('--once', action='store_true', help='Plot once and exit')
+    args = parser.parse_args()
+
+    if args.once:
+        plot_metrics(args.path, args.output)
+    else:
+        plotter = RateLimitedPlotter(args.path, args.output, args.every)
+        while True:
+            if plotter.update():
+                print("Plotted ", args.output)
+            time.sleep(min(args.every, 1))
@@ -1,5 +1,5 @@
 import numpy as np
-from HexGrid import Cell, HexGrid
+from HexGrid import Cell, HexGrid, get_topology
 
 
 class PSCell(Cell):
@@ -31,16 +31,19 @@ class PSBoard(HexGrid):
     remaining_pegs = None
 
     def __init__(self, board_size, board_shape):
-        HexGrid.__init__(self, board_size, board_shape)
-        self.board_size = board_size
-        self.board_shape = board_shape
-        populated_board = self.populate_board(PSCell)
-        self.board = self.assign_neighbors(populated_board)
+        HexGrid.__init__(self, board_size, board_shape, PSCell)
+        # Moves applied in place, as (nametag, direction), so they can be undone
+        self.move_history = []
+        # The (from, over, to) cells of every jump of the topology, in the same order
+        self.jump_cells = [(self.cells[origin], self.cells[over], self.cells[target])
+                           for (origin, over, target, _) in self.topology.jumps]
         self.update_remaining_pegs()
 
     def get_boardsize(self):
         return self.board_size
 
+    # Counts the pegs, and drops the cached legal moves. Must be called after populating or emptying
+    # cells directly, instead of through apply_move, undo_move or restore
     def update_remaining_pegs(self):
         counter = 0
         for row in self.board:
@@ -48,32 +51,100 @@ class PSBoard(HexGrid):
                 if (cell is not None) and cell.is_populated:
                     counter += 1
         self.remaining_pegs = counter
+        # The indices (in topology.jumps) of the legal jumps, rebuilt from all cells on the next use
+        self.legal_jumps = None
+        self.legal_moves = None
         return
 
     def get_remaining_pegs(self):
         return self.remaining_pegs
 
-    # Returns tuples on the form [cell, direction]
+    # Returns the set of indices of the legal jumps, checking every jump of the topology
+    # only when no cached set is kept
+    def get_legal_jumps(self):
+        if self.legal_jumps is None:
+            self.legal_jumps = {index for index, (origin, over, target) in enumerate(self.jump_cells)
+                                if origin.is_populated and over.is_populated and not target.is_populated}
+        return self.legal_jumps
+
+    # Keeps the cached legal jumps up to date after jump index was made or undone.
+    # Only the jumps that use one of its three cells are checked again
+    def update_legal_jumps(self, index):
+        self.legal_moves = None
+        legal_jumps = self.legal_jumps
+        if legal_jumps is None:
+            return
+        jump_cells = self.jump_cells
+        affected = self.topology.jumps_affected[index]
+        legal_jumps.difference_update(affected)
+        for affected_index in affected:
+            (origin, over, target) = jump_cells[affected_index]
+            if origin.is_populated and over.is_populated and not target.is_populated:
+                legal_jumps.add(affected_index)
+
+    # Returns tuples on the form [cell, direction], in the order of topology.jumps.
+    # The list is cached until the next move, and must not be modified by the caller
     def get_all_legal_moves(self):
-        legal_moves = []
-        if self.get_remaining_pegs() > 1:
-            for row in self.board:
-                for cell in row:
-                    if (cell is not None) and cell.is_populated:
-                        for move in cell.get_legal_moves():
-                            legal_moves.append(tuple([cell, move]))
-        return legal_moves
+        if self.remaining_pegs <= 1:
+            return []
+        if self.legal_moves is None:
+            cells = self.cells
+            jumps = self.topology.jumps
+            self.legal_moves = [(cells[jumps[index][0]], jumps[index][3]) for index in sorted(self.get_legal_jumps())]
+        return self.legal_moves
+
+    # The game is over when no peg can jump
+    def is_terminal(self):
+        return self.remaining_pegs <= 1 or len(self.get_legal_jumps()) == 0
+
+    def is_win(self):
+        return self.remaining_pegs == 1
+
+    # Moves a peg in place. Direction is an integer: [n, e, se, s, w, nw] = [0,1,2,3,4,5].
+    # The peg can be given either as a nametag or as a cell. Nothing is copied
+    def apply_move(self, peg, direction):
+        nametag = peg if isinstance(peg, int) else peg.get_nametag()
+        index = self.topology.jump_indices.get((nametag, direction))
+        if index is None or self.remaining_pegs <= 1 or index not in self.get_legal_jumps():
+            raise ValueError("Not a legal move")
+        (origin, over, target, _) = self.topology.jumps[index]
+        cells = self.cells
+        cells[origin].unpopulate()
+        cells[over].unpopulate()
+        cells[target].populate()
+        self.remaining_pegs -= 1
+        self.update_legal_jumps(index)
+        self.move_history.append((nametag, direction))
+
+    # Reverts the last move made with apply_move and returns it as (nametag, direction)
+    def undo_move(self):
+        (nametag, direction) = self.move_history.pop()
+        index = self.topology.jump_indices[(nametag, direction)]
+        (origin, over, target, _) = self.topology.jumps[index]
+        self.cells[origin].populate()
+        self.cells[over].populate()
+        self.cells[target].unpopulate()
+        self.remaining_pegs += 1
+        self.update_legal_jumps(index)
+        return (nametag, direction)
+
+    # Returns an immutable copy of the current state, for code that needs to keep a state around
+    def snapshot(self):
+        return PSBitBoard.from_board(self)
+
+    # Sets the board back to a snapshot. The move history is cleared
+    def restore(self, snapshot):
+        for nametag in range(1, len(self.cells)):
+            if snapshot.is_populated(nametag):
+                self.cells[nametag].populate()
+            else:
+                self.cells[nametag].unpopulate()
+        self.move_history = []
+        self.update_remaining_pegs()
 
     def get_cell(self, nametag):
-        for i in range(self.board_size):
-            for j in range(len(self.board[i])):
-                # continue to next loop iteration if cell is None
-                if self.board[i][j] is None:
-                    continue
-                else:
-                    cell = self.board[i][j]
-                    if cell.get_nametag() == nametag:
-                        return cell
+        if 0 < nametag < len(self.cells):
+            return self.cells[nametag]
         return -1
     
     # Boards are equal if their underlying matrices are equal
@@ -96,4 +167,185 @@ class PSBoard(HexGrid):
         return output
     
     def one_hot_encode(self):
-        return np.array([int(cell) for cell in list(self.__str__())])
\ No newline at end of file
+        return np.array([int(cell) for cell in list(self.__str__())])
+
+# Bit layout shared by all bitboards of the same shape and size.
+# The grid is padded with two empty columns so that a shift by one or two steps in any
+# of the six directions never wraps around into a valid cell on another row.
+class BitboardLayout:
+    def __init__(self, board_size, board_shape):
+        self.board_size = board_size
+        self.board_shape = board_shape
+        self.topology = get_topology(board_size, board_shape)
+        self.width = board_size + 2
+        # Bit offsets for the directions [n, e, se, s, w, nw] = [0,1,2,3,4,5]
+        self.offsets = [di * self.width + dj for (di, dj) in self.topology.direction_steps]
+
+        # Cell positions and bits, in nametag order
+        self.positions = list(self.topology.positions[1:])
+        self.bits = [i * self.width + j for (i, j) in self.positions]
+
+        self.valid_mask = 0
+        for bit in self.bits:
+            self.valid_mask |= 1 << bit
+
+        # bit -> nametag, (row, col) -> bit
+        self.nametags = {bit: index + 1 for index, bit in enumerate(self.bits)}
+        self.position_bits = {position: bit for position, bit in zip(self.positions, self.bits)}
+        self.bit_indices = np.array(self.bits)
+        self.nbytes = (max(self.bits) + 8) // 8
+
+    def get_bit(self, nametag):
+        return self.bits[nametag - 1]
+
+    # Shift a mask so that bit b of the result is bit b+offset of the input
+    @staticmethod
+    def shift(mask, offset):
+        if offset > 0:
+            return mask >> offset
+        return mask << -offset
+
+    # Returns the legal jumps for the pegs of a bitmask, as tuples (nametag, direction, mask),
+    # where pegs ^ mask is the bitmask after the jump
+    def get_jumps(self, pegs):
+        jumps = []
+        empty = self.valid_mask & ~pegs
+        for direction, offset in enumerate(self.offsets):
+            # A peg can jump if its neighbour is a peg and the cell behind it is empty
+            movable = pegs & self.shift(pegs, offset) & self.shift(empty, 2 * offset)
+            while movable:
+                lowest = movable & -movable
+                bit = lowest.bit_length() - 1
+                jumps.append((self.nametags[bit], direction, lowest | (1 << (bit + offset)) | (1 << (bit + 2 * offset))))
+                movable ^= lowest
+        return jumps
+
+    # True if any peg of the bitmask can jump. Only the masks are checked, no jumps are listed
+    def has_jumps(self, pegs):
+        empty = self.valid_mask & ~pegs
+        for offset in self.offsets:
+            if pegs & self.shift(pegs, offset) & self.shift(empty, 2 * offset):
+                return True
+        return False
+
+
+_bitboard_layouts = {}
+
+
+def get_bitboard_layout(board_size, board_shape):
+    key = (board_size, board_shape)
+    if key not in _bitboard_layouts:
+        _bitboard_layouts[key] = BitboardLayout(board_size, board_shape)
+    return _bitboard_layouts[key]
+
+
+class PSBitBoard:
+    """
+    Compact, immutable Peg Solitaire board storing the occupied cells as the bits of a single int.
+    Moves are tuples on the form (nametag, direction), and move_peg returns a new board.
+    Hashing and equality are plain integer operations.
+    """
+
+    def __init__(self, board_size, board_shape, pegs=None):
+        self.board_size = board_size
+        self.board_shape = board_shape
+        self.layout = get_bitboard_layout(board_size, board_shape)
+        self.pegs = self.layout.valid_mask if pegs is None else pegs
+        self.remaining_pegs = bin(self.pegs).count('1')
+
+    # Builds a bitboard holding the same pegs as a PSBoard
+    @classmethod
+    def from_board(cls, board):
+        layout = get_bitboard_layout(board.board_size, board.board_shape)
+        pegs = 0
+        for cell, bit in zip(board.cells[1:], layout.bits):
+            if cell.is_populated:
+                pegs |= 1 << bit
+        return cls(board.board_size, board.board_shape, pegs)
+
+    # The bitboard already is an immutable state
+    def snapshot(self):
+        return self
+
+    # Builds a PSBoard holding the same pegs, e.g. for visualization
+    def to_board(self):
+        board = PSBoard(self.board_size, self.board_shape)
+        for (i, j), bit in self.layout.position_bits.items():
+            if not (self.pegs >> bit) & 1:
+                board.board[i][j].unpopulate()
+        board.update_remaining_pegs()
+        return board
+
+    def get_boardsize(self):
+        return self.board_size
+
+    def get_remaining_pegs(self):
+        return self.remaining_pegs
+
+    def is_populated(self, nametag):
+        return bool((self.pegs >> self.layout.get_bit(nametag)) & 1)
+
+    # Returns a copy of the board where the cell at (row, col) is empty
+    def unpopulate(self, row, col):
+        bit = self.layout.position_bits[(row, col)]
+        return PSBitBoard(self.board_size, self.board_shape, self.pegs & ~(1 << bit))
+
+    # Returns tuples on the form (nametag, direction).
+    # Nothing is cached, as bitboards are kept as table keys and a move list per key would double their size
+    def get_all_legal_moves(self):
+        if self.remaining_pegs <= 1:
+            return []
+        return [(nametag, direction) for (nametag, direction, _) in self.layout.get_jumps(self.pegs)]
+
+    # The game is over when no peg can jump
+    def is_terminal(self):
+        return self.remaining_pegs <= 1 or not self.layout.has_jumps(self.pegs)
+
+    def is_win(self):
+        return self.remaining_pegs == 1
+
+    def is_legal_move(self, nametag, direction):
+        layout = self.layout
+        bit = layout.get_bit(nametag)
+        offset = layout.offsets[direction]
+        over = bit + offset
+        to = bit + 2 * offset
+        if to < 0 or not (layout.valid_mask >> to) & 1:
+            return False
+        return bool((self.pegs >> bit) & 1 and (self.pegs >> over) & 1 and not (self.pegs >> to) & 1)
+
+    # Move peg in direction [n, e, se, s, w, nw] = [0,1,2,3,4,5].
+    # The peg can be given either as a nametag or as a cell. Returns the resulting board
+    def move_peg(self, peg, direction):
+        nametag = peg if isinstance(peg, int) else peg.get_nametag()
+        if not self.is_legal_move(nametag, direction):
+            raise ValueError("Not a legal move")
+        bit = self.layout.get_bit(nametag)
+        offset = self.layout.offsets[direction]
+        jump = (1 << bit) | (1 << (bit + offset)) | (1 << (bit + 2 * offset))
+        return PSBitBoard(self.board_size, self.board_shape, self.pegs ^ jump)
+
+    # The board is immutable, so copies can share the same object
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __eq__(self, other):
+        return isinstance(other, PSBitBoard) and self.pegs == other.pegs and self.layout is other.layout
+
+    def __hash__(self):
+        return hash(self.pegs)
+
+    # Same '0'/'1' format as PSBoard, in nametag order
+    def __str__(self):
+        return ''.join(str((self.pegs >> bit) & 1) for bit in self.layout.bits)
+
+    def one_hot_encode(self):
+        layout = self.layout
+        as_bytes = np.frombuffer(self.pegs.to_bytes(layout.nbytes, 'little'), dtype=np.uint8)
+        return np.unpackbits(as_bytes, bitorder='little')[layout.bit_indices].astype(int)
+
+    def visualize(self, output_path):
+        self.to_board().visualize(output_path)
@@ -0,0 +1,217 @@
+import contextlib
+import csv
+import functools
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where the memory gauge is left out
+    resource = None
+
+
+# The hot paths timed by default, as (module name, class name or None for a function, attribute, timer name).
+# Timers are inclusive: decide_move includes the time of actor.get_action, which includes critic.get_td_error
+DEFAULT_TARGETS = [
+    ('main', None, 'decide_move', 'decide_move'),
+    ('main', None, 'move_peg', 'move_peg'),
+    ('PegSolitaire', 'PSBitBoard', 'move_peg', 'bitboard.move_peg'),
+    ('PegSolitaire', 'PSBitBoard', 'get_all_legal_moves', 'bitboard.legal_moves'),
+    ('PegSolitaire', 'PSBoard', 'get_all_legal_moves', 'board.legal_moves'),
+    ('PegSolitaire', 'PSBoard', 'snapshot', 'board.snapshot'),
+    ('Actor', 'Actor', 'get_action', 'actor.get_action'),
+    ('Actor', 'Actor', 'choose_action', 'actor.choose_action'),
+    ('Actor', 'Actor', 'learn', 'actor.learn'),
+    ('Critic', 'Critic', 'get_td_error', 'critic.get_td_error'),
+    ('Critic', 'Critic', 'get_td_errors', 'critic.get_td_errors'),
+    ('Critic', 'Critic', 'end_of_episode', 'critic.end_of_episode'),
+    ('CriticBase', 'CriticBase', 'get_td_error', 'critic.get_td_error'),
+    ('CriticBase', 'CriticBase', 'get_td_errors', 'critic.get_td_errors'),
+    ('CriticNN', 'CriticNN', 'end_of_episode', 'critic.end_of_episode'),
+    ('CriticNumpy', 'CriticNumpy', 'end_of_episode', 'critic.end_of_episode'),
+    ('TableStore', 'EligibilityTrace', 'visit', 'trace.visit'),
+    ('TableStore', 'EligibilityTrace', 'update', 'trace.update'),
+]
+
+
+class Profiler:
+    """
+    Named timers on the hot paths of the training loop.
+
+    The timed functions are replaced by timing wrappers on instrument(), and put back on remove(),
+    so nothing in the training loop changes, or costs anything, while no Profiler is active.
+    Modules that are not imported are skipped, so profiling does not import e.g. TensorFlow.
+
+    Input:
+    ------
+    targets: List of (module name, class name or None, attribute, timer name), see DEFAULT_TARGETS
+
+    Variables:
+    ----------
+    timers: {timer name: [calls, seconds]} of the current episode
+    sections: {section name: [calls, seconds]} of the code timed apart from the current episode, see excluded
+    episodes: One row per finished episode, with the calls and seconds of every timer, the episode time and gauges
+    """
+
+    def __init__(self, targets=None):
+        self.targets = targets if targets is not None else DEFAULT_TARGETS
+        self.timers = {}
+        self.sections = {}
+        self.episodes = []
+        self.patched = []
+        self.episode_start = None
+
+    def timed(self, name, function):
+        timer = self.timers.setdefault(name, [0, 0.0])
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timer[0] += 1
+                timer[1] += perf_counter() - start
+        return wrapper
+
+    def instrument(self):
+        """
+        Wraps every target in a timer. Returns self
+        """
+        for (module_name, class_name, attribute, name) in self.targets:
+            module = sys.modules.get(module_name)
+            if module is None and module_name == 'main':
+                module = sys.modules.get('__main__')
+            owner = module if class_name is None or module is None else getattr(module, class_name, None)
+            if owner is None or attribute not in vars(owner):
+                continue
+            original = vars(owner)[attribute]
+            setattr(owner, attribute, self.timed(name, original))
+            self.patched.append((owner, attribute, original))
+        self.episode_start = time.perf_counter()
+        return self
+
+    def remove(self):
+        """
+        Puts the original functions back
+        """
+        for (owner, attribute, original) in reversed(self.patched):
+            setattr(owner, attribute, original)
+        self.patched = []
+
+    @contextlib.contextmanager
+    def excluded(self, name):
+        """
+        Times the enclosed code as a section of its own, and leaves it out of the episode: neither the
+        episode time nor the timers include it. Used for the greedy evaluation games between training episodes
+        """
+        saved = {timer_name: list(timer) for timer_name, timer in self.timers.items()}
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            for timer_name, timer in self.timers.items():
+                timer[:] = saved.get(timer_name, [0, 0.0])
+            self.episode_start += elapsed
+            section = self.sections.setdefault(name, [0, 0.0])
+            section[0] += 1
+            section[1] += elapsed
+
+    def end_episode(self, agent=None):
+        """
+        Stores the timers of the finished episode as a row, with the table sizes of the agent and the
+        peak memory of the process as gauges, and starts the timers of the next episode
+        """
+        now = time.perf_counter()
+        row = {'episode': len(self.episodes) + 1, 'time': now - self.episode_start}
+        for name, (calls, seconds) in self.timers.items():
+            row[name + '.calls'] = calls
+            row[name + '.seconds'] = seconds
+        for name, (calls, seconds) in self.sections.items():
+            row[name + '.excluded_calls'] = calls
+            row[name + '.excluded_seconds'] = seconds
+        if agent is not None:
+            row['actor_table_size'] = len(agent.actor.state_action_values)
+            if hasattr(agent.critic, 'value_of_states'):
+                row['critic_table_size'] = len(agent.critic.value_of_states)
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            row['max_rss_bytes'] = max_rss if sys.platform == 'darwin' else max_rss * 1024
+        self.episodes.append(row)
+
+        for timer in list(self.timers.values()) + list(self.sections.values()):
+            timer[0] = 0
+            timer[1] = 0.0
+        self.episode_start = time.perf_counter()
+        return row
+
+    def get_totals(self):
+        """
+        Returns the aggregate of all episodes: {timer name: {'calls', 'seconds', 'seconds_per_call', 'share'}},
+        where share is the fraction of the total episode time spent in the timer
+        """
+        total_time = sum(row['time'] for row in self.episodes)
+        totals = {}
+        for name in self.timers:
+            calls = sum(row.get(name + '.calls', 0) for row in self.episodes)
+            seconds = sum(row.get(name + '.seconds', 0.0) for row in self.episodes)
+            totals[name] = {'calls': calls,
+                            'seconds': seconds,
+                            'seconds_per_call': seconds / calls if calls > 0 else 0.0,
+                            'share': seconds / total_time if total_time > 0 else 0.0}
+        return totals
+
+    def get_excluded_totals(self):
+        """
+        Returns the aggregate of the sections timed apart from the episodes: {section name: {'calls', 'seconds'}}
+        """
+        return {name: {'calls': sum(row.get(name + '.excluded_calls', 0) for row in self.episodes),
+                       'seconds': sum(row.get(name + '.excluded_seconds', 0.0) for row in self.episodes)}
+                for name in self.sections}
+
+    def report(self):
+        """
+        Returns the aggregate breakdown as a text table, the slowest timers first
+        """
+        totals = self.get_totals()
+        lines = [f'{len(self.episodes)} episodes in {sum(row["time"] for row in self.episodes):.3f}s',
+                 f'{"timer":<24}{"calls":>10}{"seconds":>12}{"us/call":>10}{"share":>8}']
+        for name, total in sorted(totals.items(), key=lambda item: -item[1]['seconds']):
+            if total['calls'] == 0:
+                continue
+            lines.append(f'{name:<24}{total["calls"]:>10}{total["seconds"]:>12.4f}'
+                         f'{total["seconds_per_call"] * 1e6:>10.1f}{total["share"]:>8.1%}')
+        for name, total in self.get_excluded_totals().items():
+            lines.append(f'{name} (not in the episodes): {total["calls"]} calls in {total["seconds"]:.3f}s')
+        if len(self.episodes) > 0:
+            gauges = {name: value for name, value in self.episodes[-1].items()
+                      if name.endswith('_size') or name.endswith('_bytes')}
+            lines.append('last episode: ' + ', '.join(f'{name} {value}' for name, value in gauges.items()))
+        return '\n'.join(lines)
+
+    def save_csv(self, path):
+        """
+        Writes one row per episode
+        """
+        fields = []
+        for row in self.episodes:
+            for field in row:
+                if field not in fields:
+                    fields.append(field)
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(self.episodes)
+
+    def save_json(self, path):
+        """
+        Writes the aggregate breakdown and the rows of every episode
+        """
+        with open(path, 'w') as file:
+            json.dump({'totals': self.get_totals(), 'excluded': self.get_excluded_totals(), 'episodes': self.episodes},
+                      file, indent=2)
@@ -0,0 +1,141 @@
+import time
+
+from Symmetry import get_board_symmetries
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised inside the search when the node or time budget of the Solver is used up
+    """
+
+
+class SolverResult:
+    """
+    Result of an exact search from a start position
+
+    Variables:
+    ----------
+    complete: False if the search ran out of its node or time budget, and the result is unknown
+    best_pegs: The smallest number of remaining pegs reachable from the start position (None if not complete)
+    solvable: True if best_pegs is 1 (None if not complete)
+    moves: An optimal move sequence, as a list of (nametag, direction) (empty if not complete)
+    nodes: Number of positions expanded by the search
+    transpositions: Number of dead positions stored in the transposition table
+    time: Search time in seconds
+    """
+
+    def __init__(self, best_pegs, moves, nodes, transpositions, search_time):
+        self.complete = best_pegs is not None
+        self.best_pegs = best_pegs
+        self.solvable = best_pegs == 1 if self.complete else None
+        self.moves = moves
+        self.nodes = nodes
+        self.transpositions = transpositions
+        self.time = search_time
+
+    def __str__(self):
+        if not self.complete:
+            return (f'unknown, budget used up after nodes: {self.nodes}, transpositions: {self.transpositions}, '
+                    f'time: {self.time:.3f}s')
+        return (f'best remaining pegs: {self.best_pegs}, moves: {len(self.moves)}, nodes: {self.nodes}, '
+                f'transpositions: {self.transpositions}, time: {self.time:.3f}s')
+
+
+class Solver:
+    """
+    Exact depth-first solver for Peg Solitaire on bitboards.
+
+    Every dead position (one that cannot reach a single peg) is stored in a transposition table with the
+    smallest number of pegs reachable from it, so it is never searched twice. Positions that reach a single peg
+    are not stored, as the search stops at the first one: nothing can do better.
+    The search gives up, with an incomplete result, when it has expanded max_nodes positions or run for
+    max_time seconds, which also bounds the size of the transposition table.
+
+    Input:
+    ------
+    use_symmetry (bool): Store symmetric positions under one canonical key in the transposition table
+    max_nodes (int): Number of positions expanded before the search gives up. None for no limit
+    max_time (float): Seconds of search before it gives up. None for no limit
+    """
+
+    # The clock is read once per this many expanded positions
+    time_check_interval = 1024
+
+    def __init__(self, use_symmetry=True, max_nodes=None, max_time=None):
+        self.use_symmetry = use_symmetry
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self.transpositions = {}
+        self.nodes = 0
+
+    def solve(self, board):
+        """
+        Finds the smallest reachable number of remaining pegs and a move sequence reaching it
+
+        Input:
+            board: PSBoard or PSBitBoard with the start position
+        Output:
+            SolverResult, not complete if the budget was used up
+        """
+        start = time.time()
+        state = board.snapshot()
+        self.layout = state.layout
+        self.symmetries = get_board_symmetries(state.board_size, state.board_shape) if self.use_symmetry else None
+        self.transpositions = {}
+        self.nodes = 0
+        self.deadline = start + self.max_time if self.max_time is not None else None
+
+        try:
+            best_pegs = self.search(state.pegs, state.get_remaining_pegs())
+        except BudgetExceeded:
+            return SolverResult(None, [], self.nodes, len(self.transpositions), time.time() - start)
+        # The moves are found again without a budget, but only the positions along the best sequence are searched
+        self.max_nodes = self.deadline = None
+        moves = self.get_moves(state.pegs, state.get_remaining_pegs(), best_pegs)
+        return SolverResult(best_pegs, moves, self.nodes, len(self.transpositions), time.time() - start)
+
+    def get_key(self, pegs):
+        if self.symmetries is None:
+            return pegs
+        return self.symmetries.canonicalize(pegs)[0]
+
+    def search(self, pegs, remaining_pegs):
+        """
+        Returns the smallest number of pegs reachable from the bitmask pegs
+        """
+        key = self.get_key(pegs)
+        if key in self.transpositions:
+            return self.transpositions[key]
+
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded()
+        if self.deadline is not None and self.nodes % self.time_check_interval == 0 and time.time() > self.deadline:
+            raise BudgetExceeded()
+
+        best = remaining_pegs
+        if remaining_pegs > 1:
+            for (_, _, jump) in self.layout.get_jumps(pegs):
+                best = min(best, self.search(pegs ^ jump, remaining_pegs - 1))
+                if best == 1:
+                    break
+
+        if best > 1:
+            self.transpositions[key] = best
+        return best
+
+    # Follows the transposition table from the start position along moves that keep the best result
+    def get_moves(self, pegs, remaining_pegs, best_pegs):
+        moves = []
+        while remaining_pegs > best_pegs:
+            for (nametag, direction, jump) in self.layout.get_jumps(pegs):
+                if self.search(pegs ^ jump, remaining_pegs - 1) == best_pegs:
+                    moves.append((nametag, direction))
+                    pegs ^= jump
+                    remaining_pegs -= 1
+                    break
+        return moves
+
+
+def solve(board, use_symmetry=True, max_nodes=None, max_time=None):
+    return Solver(use_symmetry, max_nodes, max_time).solve(board)
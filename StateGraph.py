@@ -0,0 +1,216 @@
+import hashlib
+import os
+import time
+import types
+
+import numpy as np
+
+from PegSolitaire import PSBitBoard
+
+
+class StateGraph:
+    """
+    Every state reachable from a start position, enumerated breadth-first and numbered from 0 (the start).
+    All data is kept in flat numpy arrays, which can be stored on disk and memory-mapped by later runs.
+
+    Variables:
+    ----------
+    pegs: pegs[id] is the bitmask of the state (see PSBitBoard)
+    remaining_pegs: remaining_pegs[id] is the number of pegs of the state
+    offsets: The successors of state id are successors[offsets[id]:offsets[id + 1]]
+    successors: State id reached by each move
+    nametags, directions: The move (nametag, direction) of each entry in successors
+    terminal: terminal[id] is True if the state has no legal moves
+    win: win[id] is True if the state has a single peg left
+    rewards: rewards[id] is the reward given for reaching the state
+    """
+
+    arrays = ('pegs', 'remaining_pegs', 'offsets', 'successors', 'nametags', 'directions', 'terminal', 'win',
+              'rewards')
+
+    def __init__(self, board_size, board_shape, **arrays):
+        self.board_size = board_size
+        self.board_shape = board_shape
+        for name in self.arrays:
+            setattr(self, name, arrays[name])
+
+    def __len__(self):
+        return len(self.pegs)
+
+    def get_state(self, state_id):
+        """
+        Returns the PSBitBoard of a state, e.g. for visualization
+        """
+        return PSBitBoard(self.board_size, self.board_shape, int(self.pegs[state_id]))
+
+    def get_moves(self, state_id):
+        """
+        Returns the legal moves of a state as (nametag, direction) tuples, and the states they lead to
+        """
+        start, end = self.offsets[state_id], self.offsets[state_id + 1]
+        moves = [(int(nametag), int(direction)) for nametag, direction
+                 in zip(self.nametags[start:end], self.directions[start:end])]
+        return moves, self.successors[start:end]
+
+    def save(self, path):
+        """
+        Writes the graph to a directory with one .npy file per array.
+        The directory is written under a temporary name and renamed when complete
+        """
+        temporary_path = path + '.tmp'
+        os.makedirs(temporary_path, exist_ok=True)
+        np.save(os.path.join(temporary_path, 'geometry.npy'), np.array([self.board_size, self.board_shape]))
+        for name in self.arrays:
+            np.save(os.path.join(temporary_path, name + '.npy'), getattr(self, name))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps a graph written by save
+        """
+        (board_size, board_shape) = np.load(os.path.join(path, 'geometry.npy'))
+        arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in cls.arrays}
+        return cls(int(board_size), int(board_shape), **arrays)
+
+
+def build_state_graph(board, reward_func):
+    """
+    Enumerates every state reachable from the board breadth-first
+
+    Input:
+        board: PSBoard or PSBitBoard with the start position
+        reward_func: The reward function of the game, called once per state
+    Output:
+        StateGraph
+    """
+    start_state = board.snapshot()
+    layout = start_state.layout
+
+    ids = {start_state.pegs: 0}
+    order = [start_state.pegs]
+    remaining_pegs = [start_state.get_remaining_pegs()]
+    offsets = [0]
+    successors = []
+    nametags = []
+    directions = []
+
+    i = 0
+    while i < len(order):
+        pegs = order[i]
+        if remaining_pegs[i] > 1:
+            for (nametag, direction, jump) in layout.get_jumps(pegs):
+                child = pegs ^ jump
+                child_id = ids.get(child)
+                if child_id is None:
+                    child_id = len(order)
+                    ids[child] = child_id
+                    order.append(child)
+                    remaining_pegs.append(remaining_pegs[i] - 1)
+                successors.append(child_id)
+                nametags.append(nametag)
+                directions.append(direction)
+        offsets.append(len(successors))
+        i += 1
+
+    offsets = np.array(offsets, dtype=np.int64)
+    terminal = offsets[1:] == offsets[:-1]
+    rewards = np.array([reward_func(PSBitBoard(start_state.board_size, start_state.board_shape, pegs))
+                        for pegs in order], dtype=np.float64)
+
+    return StateGraph(start_state.board_size, start_state.board_shape,
+                      pegs=np.array(order, dtype=np.uint64),
+                      remaining_pegs=np.array(remaining_pegs, dtype=np.uint8),
+                      offsets=offsets,
+                      successors=np.array(successors, dtype=np.int64),
+                      nametags=np.array(nametags, dtype=np.uint8),
+                      directions=np.array(directions, dtype=np.uint8),
+                      terminal=terminal,
+                      win=np.array(remaining_pegs, dtype=np.uint8) == 1,
+                      rewards=rewards)
+
+
+# Version of the arrays written by StateGraph.save. Graphs cached by an older version are not reused
+GRAPH_FORMAT_VERSION = 2
+
+
+def get_reward_key(reward_func):
+    """
+    Returns a short hash of the code of the reward function, including its constants, so a graph built
+    with other rewards is not reused. Callables without code are keyed by their type
+    """
+    def describe(code):
+        constants = tuple(describe(constant) if isinstance(constant, types.CodeType) else repr(constant)
+                          for constant in code.co_consts)
+        return code.co_code, constants, code.co_names
+
+    code = getattr(reward_func, '__code__', None)
+    description = describe(code) if code is not None else (type(reward_func).__module__, type(reward_func).__qualname__)
+    return hashlib.sha1(repr(description).encode()).hexdigest()[:8]
+
+
+def get_state_graph(board, reward_func, cache_dir='out/graphs'):
+    """
+    Returns the state graph of the board's start position, memory-mapped from cache_dir if it has been built
+    before, and built and stored there otherwise. The cache is keyed by the board shape, size and start position,
+    the format version and the code of the reward function, whose rewards are stored in the graph
+    """
+    start_state = board.snapshot()
+    path = os.path.join(cache_dir, f'{start_state.board_shape}_{start_state.board_size}_{start_state.pegs:x}'
+                                   f'_v{GRAPH_FORMAT_VERSION}_{get_reward_key(reward_func)}')
+    if not os.path.isdir(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        build_state_graph(start_state, reward_func).save(path)
+    return StateGraph.load(path)
+
+
+def play_graph_game(graph, agent, is_greedy, learn=True):
+    """
+    Plays a game on the state graph. States are graph ids and actions are the index of the move among the
+    state's moves, so no board objects are built. Requires a table Critic without symmetry canonicalization
+
+    Input:
+        graph: StateGraph
+        agent: Agent
+        is_greedy: True/False flag to force the greedy choice
+        learn: True/False flag for whether the Actor and Critic learn from the game
+    Output:
+        List of the visited state ids
+    """
+    critic = agent.critic
+    state = 0
+    history = [state]
+    while not graph.terminal[state]:
+        first_move = int(graph.offsets[state])
+        action = agent.choose_action(state, range(int(graph.offsets[state + 1]) - first_move), is_greedy)
+        next_state = int(graph.successors[first_move + action])
+
+        if learn:
+            # delta <- r + gamma*V(s') - V(s), terminal states have value 0
+            value_1 = 0 if graph.terminal[next_state] else critic.value_of_states.get_value(next_state, default=0)
+            value_0 = critic.value_of_states.get_value(state, default=0)
+            td_error = graph.rewards[next_state] + critic.discount * value_1 - value_0
+            agent.learn(state, action, td_error)
+
+        state = next_state
+        history.append(state)
+    return history
+
+
+def train_on_graph(graph, agent, episodes):
+    """
+    Trains the agent on the state graph for a number of episodes
+
+    Output:
+        List of the number of remaining pegs after each episode
+    """
+    results = []
+    start = time.time()
+    for n in range(episodes):
+        history = play_graph_game(graph, agent, is_greedy=False)
+        nr_pegs = int(graph.remaining_pegs[history[-1]])
+        print("Game ", n + 1, " : ", nr_pegs, " in ", time.time() - start, "s")
+        results.append(nr_pegs)
+        agent.end_of_episode(episodes)
+        start = time.time()
+    return results
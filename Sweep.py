@@ -0,0 +1,214 @@
+import csv
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Agent import CriticType
+from Checkpoint import load_checkpoint, save_checkpoint
+from main import Settings, evaluate_greedy, get_agent, get_game_board, play_game
+
+
+class SweepSettings:
+    """
+    Input parameters for a hyperparameter sweep over the fields of Settings
+    """
+
+    # Search space over the Settings fields:
+    #   [a, b, c]           one of the listed values
+    #   (low, high)         uniform in [low, high]
+    #   (low, high, 'log')  log-uniform in [low, high]
+    # Fields not in the search space keep their value from Settings, or from fixed_settings (see make_pool)
+    fixed_settings = {'critic_type': CriticType.TABLE}
+    search_space = {
+        'epsilon': [0.5, 0.9, 0.99],
+        'epsilon_decay_param': (0.5, 1.0),
+        'l_rate_actor': (0.001, 0.5, 'log'),
+        'l_rate_critic': (0.001, 0.5, 'log'),
+        'discount_actor': [0.8, 0.9, 0.99],
+        'discount_critic': [0.8, 0.9, 0.99],
+        'decay_actor': [0.7, 0.8, 0.9],
+        'decay_critic': [0.7, 0.8, 0.9],
+    }
+
+    n_trials = 32
+    seed = 0
+
+    # Successive halving: every trial first plays min_episodes episodes. After each rung the best 1/eta of the
+    # trials continue until they have played eta times as many episodes, until max_episodes is reached.
+    # Trials are ranked on greedy_games greedy games played without learning at the end of the rung, as the
+    # exploring games are mostly random while epsilon is high. Each trial writes a checkpoint to checkpoint_dir
+    # at the end of a rung, and continues from it in the next one
+    min_episodes = 100
+    max_episodes = 2000
+    eta = 2
+    greedy_games = 10
+    checkpoint_dir = 'out/sweep'
+
+    # Number of worker processes, None for all cores
+    n_workers = None
+    output_path = 'out/sweep.csv'
+
+
+# Draws n_trials configurations from the search space, reproducibly from seed
+def sample_configurations(search_space, n_trials, seed):
+    rng = random.Random(seed)
+    configurations = []
+    for _ in range(n_trials):
+        configuration = {}
+        for field, space in search_space.items():
+            if isinstance(space, list):
+                configuration[field] = rng.choice(space)
+            elif len(space) == 3 and space[2] == 'log':
+                configuration[field] = math.exp(rng.uniform(math.log(space[0]), math.log(space[1])))
+            else:
+                configuration[field] = rng.uniform(space[0], space[1])
+        configurations.append(configuration)
+    return configurations
+
+
+# Settings object with the fields of the configuration overriding the ones in Settings
+def make_settings(configuration):
+    settings = Settings()
+    for field, value in configuration.items():
+        setattr(settings, field, value)
+    return settings
+
+
+def seed_everything(seed, critic_type):
+    random.seed(seed)
+    np.random.seed(seed)
+    if critic_type is CriticType.NN:
+        import tensorflow as tf
+        tf.random.set_seed(seed)
+
+
+def run_trial(configuration, seed, episodes, max_episodes, greedy_games, checkpoint_path, first_episode=0):
+    """
+    Trains an agent with the given configuration until it has played a number of episodes, continuing from
+    the checkpoint of the trial after first_episode episodes, and ranks it on greedy games.
+    Runs in a worker process. The epsilon schedule is set by max_episodes, and all randomness is seeded
+    from the seed and first_episode, so a trial gives the same results whatever worker runs it
+
+    Input:
+        configuration: Dictionary of Settings fields to override
+        seed: Seed of the trial
+        episodes: Number of episodes played at the end of the rung
+        max_episodes: Number of episodes of the full run, used for the epsilon decay
+        greedy_games: Number of greedy games played, without learning, to rank the trial
+        checkpoint_path: Checkpoint of the trial, read when first_episode > 0 and written at the end
+        first_episode: Number of episodes played in the earlier rungs
+    Output:
+        Dictionary with the greedy win rate and mean number of remaining pegs, the win rate of the
+        episodes trained in the rung and the run time
+    """
+    settings = make_settings(configuration)
+    seed_everything(seed + first_episode, settings.critic_type)
+
+    start = time.time()
+    agent = get_agent(settings)
+    board = get_game_board(settings)
+    agent.initialize_game(board)
+    if first_episode > 0:
+        load_checkpoint(agent, checkpoint_path)
+
+    results = []
+    for _ in range(first_episode, episodes):
+        results.append(play_game(board, agent, False, False).get_remaining_pegs())
+        agent.end_of_episode(max_episodes)
+    save_checkpoint(agent, episodes, checkpoint_path)
+
+    greedy_results = [evaluate_greedy(board, agent) for _ in range(greedy_games)]
+    return {'greedy_win_rate': greedy_results.count(1) / greedy_games,
+            'greedy_mean_pegs': sum(greedy_results) / greedy_games,
+            'win_rate': results.count(1) / len(results),
+            'time': time.time() - start}
+
+
+def make_pool(n_workers, **kwargs):
+    """
+    Returns a ProcessPoolExecutor of spawned workers, used by the sweep and the evaluation.
+    Spawned workers do not inherit the state of an already imported TensorFlow. They are new processes,
+    so changes made to Settings at runtime are not seen by them, and are passed in the tasks instead
+
+    Input:
+        n_workers: Number of worker processes, None for all cores
+        kwargs: Passed on to ProcessPoolExecutor, e.g. initializer and initargs
+    """
+    return ProcessPoolExecutor(max_workers=n_workers or os.cpu_count(), mp_context=multiprocessing.get_context('spawn'),
+                               **kwargs)
+
+
+def run_sweep(sweep_settings=SweepSettings):
+    """
+    Runs a successive halving sweep over the search space in a process pool, and writes a row per
+    trial and rung to sweep_settings.output_path
+
+    Output:
+        List of result rows, the best trial of the last rung first
+    """
+    configurations = sample_configurations(sweep_settings.search_space, sweep_settings.n_trials, sweep_settings.seed)
+    trials = [{'trial': i, 'seed': sweep_settings.seed * 100003 + i, 'configuration': configuration,
+               'checkpoint_path': os.path.join(sweep_settings.checkpoint_dir, f'trial_{i}.npz')}
+              for i, configuration in enumerate(configurations)]
+    os.makedirs(sweep_settings.checkpoint_dir, exist_ok=True)
+
+    rows = []
+    episodes = sweep_settings.min_episodes
+    first_episode = 0
+    rung = 0
+    with make_pool(sweep_settings.n_workers) as pool:
+        while True:
+            episodes = min(episodes, sweep_settings.max_episodes)
+            futures = [pool.submit(run_trial, dict(sweep_settings.fixed_settings, **trial['configuration']),
+                                   trial['seed'], episodes, sweep_settings.max_episodes, sweep_settings.greedy_games,
+                                   trial['checkpoint_path'], first_episode) for trial in trials]
+            rung_rows = []
+            for trial, future in zip(trials, futures):
+                row = {'trial': trial['trial'], 'seed': trial['seed'], 'rung': rung, 'episodes': episodes}
+                row.update(trial['configuration'])
+                row.update(future.result())
+                row['checkpoint_path'] = trial['checkpoint_path']
+                rung_rows.append(row)
+            rung_rows.sort(key=lambda row: (-row['greedy_win_rate'], row['greedy_mean_pegs'], -row['win_rate']))
+
+            # Keep the best 1/eta of the trials
+            n_promoted = max(1, math.ceil(len(trials) / sweep_settings.eta))
+            is_last_rung = episodes >= sweep_settings.max_episodes or len(trials) == 1
+            for i, row in enumerate(rung_rows):
+                row['status'] = 'final' if is_last_rung else ('promoted' if i < n_promoted else 'stopped')
+            rows.extend(rung_rows)
+            print("Rung ", rung, " : ", len(trials), " trials of ", episodes, " episodes, best greedy win rate ",
+                  rung_rows[0]['greedy_win_rate'])
+
+            if is_last_rung:
+                break
+            promoted = set(row['trial'] for row in rung_rows[:n_promoted])
+            trials = [trial for trial in trials if trial['trial'] in promoted]
+            first_episode = episodes
+            episodes *= sweep_settings.eta
+            rung += 1
+
+    write_results(rows, sweep_settings.output_path)
+    return rows[-len(trials):]
+
+
+def write_results(rows, output_path):
+    fields = []
+    for row in rows:
+        for field in row:
+            if field not in fields:
+                fields.append(field)
+    with open(output_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    best = run_sweep()
+    print("Best configuration: ", {field: best[0][field] for field in SweepSettings.search_space})
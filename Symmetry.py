@@ -0,0 +1,152 @@
+from HexGrid import Shape, get_topology
+from PegSolitaire import PSBitBoard, get_bitboard_layout
+
+
+class BoardSymmetries:
+    """
+    The symmetries of a board of a given shape and size.
+    Diamond boards have 4 (identity, the two diagonal mirrors and the 180 degree rotation),
+    triangle boards have 6 (the permutations of the three corners).
+
+    Variables:
+    ----------
+    cell_maps: cell_maps[t][nametag] is the nametag the cell is moved to by transform t
+    direction_maps: direction_maps[t][direction] is the direction [n, e, se, s, w, nw] is turned into by transform t
+    byte_tables: byte_tables[t][k][v] is the transformed bitmask of the pegs v in the k'th byte of a bitboard
+    """
+
+    def __init__(self, board_size, board_shape):
+        self.board_size = board_size
+        self.board_shape = board_shape
+        self.topology = get_topology(board_size, board_shape)
+        self.layout = get_bitboard_layout(board_size, board_shape)
+
+        self.cell_maps = []
+        self.direction_maps = []
+        self.byte_tables = []
+        for transform in self.get_transforms():
+            self.cell_maps.append(self.get_cell_map(transform))
+            self.direction_maps.append(self.get_direction_map(transform))
+            self.byte_tables.append(self.get_byte_tables(self.cell_maps[-1]))
+
+    # Returns the symmetries as functions mapping a (row, col) position to a (row, col) position
+    def get_transforms(self):
+        m = self.board_size - 1
+        if self.board_shape == Shape.DIAMOND:
+            return [lambda i, j: (i, j),
+                    lambda i, j: (j, i),
+                    lambda i, j: (m - i, m - j),
+                    lambda i, j: (m - j, m - i)]
+
+        # Triangle cells in barycentric coordinates (a, b, c) = (j, i - j, m - i), where a + b + c = m.
+        # Every permutation of (a, b, c) is a symmetry, and (i, j) = (a + b, a)
+        permutations = [(0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1), (2, 1, 0)]
+
+        def make_transform(permutation):
+            def transform(i, j):
+                coordinates = (j, i - j, m - i)
+                a, b = coordinates[permutation[0]], coordinates[permutation[1]]
+                return (a + b, a)
+            return transform
+
+        return [make_transform(permutation) for permutation in permutations]
+
+    def get_cell_map(self, transform):
+        cell_map = [None]
+        for (i, j) in self.topology.positions[1:]:
+            cell_map.append(self.topology.get_nametag(*transform(i, j)))
+        return tuple(cell_map)
+
+    # The transforms are affine, so every step in a direction is turned into the same step
+    def get_direction_map(self, transform):
+        steps = self.topology.direction_steps
+        (i0, j0) = transform(0, 0)
+        direction_map = []
+        for (di, dj) in steps:
+            (i1, j1) = transform(di, dj)
+            direction_map.append(steps.index((i1 - i0, j1 - j0)))
+        return tuple(direction_map)
+
+    # Precomputes the transformed pegs of every possible byte of a bitboard, so a whole board
+    # is transformed with one table lookup per byte
+    def get_byte_tables(self, cell_map):
+        layout = self.layout
+        target_bits = {}
+        for nametag, bit in enumerate(layout.bits, start=1):
+            target_bits[bit] = layout.get_bit(cell_map[nametag])
+
+        tables = []
+        for k in range(layout.nbytes):
+            table = [0] * 256
+            for value in range(1, 256):
+                lowest = value & -value
+                bit = 8 * k + lowest.bit_length() - 1
+                table[value] = table[value ^ lowest] | (1 << target_bits[bit] if bit in target_bits else 0)
+            tables.append(table)
+        return tables
+
+    def transform_pegs(self, pegs, t):
+        transformed = 0
+        for table in self.byte_tables[t]:
+            transformed |= table[pegs & 0xFF]
+            pegs >>= 8
+        return transformed
+
+    # Returns the canonical bitmask (the smallest one over all symmetries) and the transform giving it
+    def canonicalize(self, pegs):
+        best_pegs = pegs
+        best_t = 0
+        for t in range(1, len(self.byte_tables)):
+            transformed = self.transform_pegs(pegs, t)
+            if transformed < best_pegs:
+                best_pegs = transformed
+                best_t = t
+        return best_pegs, best_t
+
+    # Action on the form (nametag, direction)
+    def transform_action(self, action, t):
+        return (self.cell_maps[t][action[0]], self.direction_maps[t][action[1]])
+
+
+_board_symmetries = {}
+
+
+def get_board_symmetries(board_size, board_shape):
+    key = (board_size, board_shape)
+    if key not in _board_symmetries:
+        _board_symmetries[key] = BoardSymmetries(board_size, board_shape)
+    return _board_symmetries[key]
+
+
+class SymmetryCanonicalizer:
+    """
+    Maps states (PSBitBoard) and actions (nametag, direction) to a canonical orientation,
+    so the Actor and Critic share what they learn between symmetric positions.
+    """
+
+    def canonical_state(self, state):
+        """
+        Input:
+            state: PSBitBoard
+        Output:
+            canonical_state: PSBitBoard in the canonical orientation
+            transform: the transform from state to canonical_state, used to map actions with canonical_action
+        """
+        symmetries = get_board_symmetries(state.board_size, state.board_shape)
+        pegs, transform = symmetries.canonicalize(state.pegs)
+        if transform == 0:
+            return state, transform
+        return PSBitBoard(state.board_size, state.board_shape, pegs), transform
+
+    def canonical_action(self, state, action, transform):
+        """
+        Input:
+            state: the (non-canonical) state the action is performed in
+            action: tuple (nametag, direction)
+            transform: the transform returned by canonical_state for the state
+        Output:
+            action in the canonical orientation
+        """
+        if transform == 0:
+            return action
+        return get_board_symmetries(state.board_size, state.board_shape).transform_action(action, transform)
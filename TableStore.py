@@ -0,0 +1,266 @@
+import numpy as np
+
+
+class TableStore:
+    """
+    Compact table of values, used by the Actor and the table Critic.
+
+    Each key is interned to an integer entry id the first time it is stored. Values are kept in contiguous
+    1-D numpy arrays indexed by entry, which grow by doubling, so the TD-updates can run as vectorized
+    array operations over a list of visited entries. The eligibilities are kept by the EligibilityTraces.
+    The layout is sparse: only the keys that have been visited take space, e.g. the Actor has one entry
+    per state-action pair seen, not one per action known in every state.
+
+    The store can be used like a dictionary, with keys tuple([state, action]) when pair_keys is True,
+    or plain states when pair_keys is False.
+
+    Variables:
+    ----------
+    entry_ids: Dictionary mapping each key to its entry, format: {key: entry}
+    entry_keys: List of the keys, entry_keys[entry] is the key of the entry
+    actions: Dictionary interning the actions, so all keys with equal actions share one action object
+    values: numpy array of the values, format: values[entry]
+    known: numpy bool array, True where a value has been stored
+    """
+
+    def __init__(self, pair_keys, capacity=1024):
+        self.pair_keys = pair_keys
+        self.entry_ids = {}
+        self.entry_keys = []
+        self.actions = {}
+        self.n_known = 0
+
+        self.values = np.zeros(capacity)
+        self.known = np.zeros(capacity, dtype=bool)
+
+    def split_key(self, key):
+        if self.pair_keys:
+            return key[0], key[1]
+        return key, None
+
+    def make_key(self, state, action=None):
+        if self.pair_keys:
+            return tuple([state, action])
+        return state
+
+    def find(self, state, action=None):
+        """
+        Returns the entry of a state-action pair, or None if the pair has not been interned
+        """
+        return self.entry_ids.get(self.make_key(state, action))
+
+    def index(self, state, action=None):
+        """
+        Returns the entry of a state-action pair, interning the pair if needed
+        """
+        key = self.make_key(state, action)
+        entry = self.entry_ids.get(key)
+        if entry is None:
+            entry = len(self.entry_keys)
+            if entry == len(self.values):
+                self.grow(2 * entry)
+            if self.pair_keys:
+                key = tuple([state, self.actions.setdefault(action, action)])
+            self.entry_ids[key] = entry
+            self.entry_keys.append(key)
+        return entry
+
+    # Amortized doubling of the arrays
+    def grow(self, capacity):
+        for name in ('values', 'known'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def get_value(self, state, action=None, default=0):
+        entry = self.entry_ids.get(self.make_key(state, action))
+        if entry is None or not self.known[entry]:
+            return default
+        return self.values[entry]
+
+    def set_value(self, state, action, value):
+        entry = self.index(state, action)
+        if not self.known[entry]:
+            self.known[entry] = True
+            self.n_known += 1
+        self.values[entry] = value
+
+    def mark_known(self, entries):
+        """
+        Flags the given entries as holding values, after they have been updated directly in the arrays
+        """
+        new = ~self.known[entries]
+        if new.any():
+            self.n_known += int(np.count_nonzero(new))
+            self.known[entries] = True
+
+    def get_arrays(self):
+        """
+        Returns the entries that hold values, e.g. for checkpoints
+        Output:
+            states: list, states[i] is the state of entry i
+            actions: list, actions[i] is the action of entry i (empty when pair_keys is False)
+            values: numpy array, values[i] is the value of entry i
+        """
+        entries = np.flatnonzero(self.known[:len(self.entry_keys)])
+        keys = [self.split_key(self.entry_keys[entry]) for entry in entries]
+        actions = [action for (_, action) in keys] if self.pair_keys else []
+        return [state for (state, _) in keys], actions, self.values[entries].copy()
+
+    def set_arrays(self, states, actions, values):
+        """
+        Replaces the contents of the store with arrays returned by get_arrays
+        """
+        self.entry_ids = {}
+        self.entry_keys = []
+        self.actions = {}
+        capacity = max(len(states), 1)
+        self.values = np.zeros(capacity)
+        self.known = np.zeros(capacity, dtype=bool)
+        self.n_known = 0
+        for i, state in enumerate(states):
+            self.set_value(state, actions[i] if self.pair_keys else None, values[i])
+
+    def set_read_only(self):
+        """
+        Makes the value arrays read-only, so any attempt to learn into the store raises a ValueError.
+        Used when evaluating a trained agent
+        """
+        for array in (self.values, self.known):
+            array.flags.writeable = False
+
+    # Dictionary interface
+
+    def __contains__(self, key):
+        entry = self.entry_ids.get(key)
+        return entry is not None and bool(self.known[entry])
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        return self.values[self.entry_ids[key]]
+
+    def __setitem__(self, key, value):
+        state, action = self.split_key(key)
+        self.set_value(state, action, value)
+
+    def get(self, key, default=0):
+        return self.get_value(*self.split_key(key), default=default)
+
+    def __len__(self):
+        return self.n_known
+
+    def keys(self):
+        for entry in np.flatnonzero(self.known[:len(self.entry_keys)]):
+            yield self.entry_keys[entry]
+
+    def items(self):
+        for key in self.keys():
+            yield key, self.get(key)
+
+    def __iter__(self):
+        return self.keys()
+
+
+class EligibilityTrace:
+    """
+    The active eligibility trace of one episode over a TableStore.
+
+    The trace keeps the eligibilities of its own entries, so several traces (e.g. one per game played in lockstep)
+    can learn into the same store independently, each updating the values of the entries it visited.
+
+    Every visited entry decays by the same factor (discount * decay) each step, and the newest entry starts at 1,
+    so the entries above a threshold are always the most recent ones. A bounded trace keeps only those
+    (at most max_length) in a ring buffer, and drops older entries, which turns the
+    O(T) per step update into O(length of the trace).
+
+    Input:
+    ------
+    store (TableStore): The store holding the values
+    trace_factor (float): The factor every eligibility is multiplied with per step (discount * decay)
+    threshold (float): Entries with eligibility below threshold are dropped. 0 keeps all entries
+    max_length (int): Maximum number of entries in the trace. None for no limit
+
+    Variables:
+    ----------
+    entries: numpy array of the TableStore entries in the trace
+    eligibilities: numpy array of their eligibilities, eligibilities[i] is the eligibility of entries[i]
+    positions: Dictionary mapping each entry in the trace to its position, format: {entry: i}
+    length: Number of entries in the trace
+    skipped_updates: Number of entry updates skipped because their entries were dropped from the trace
+    """
+
+    def __init__(self, store, trace_factor, threshold=0, max_length=None):
+        self.store = store
+        self.trace_factor = trace_factor
+        self.capacity = self.get_capacity(trace_factor, threshold, max_length)
+
+        self.entries = np.zeros(self.capacity or 64, dtype=np.int64)
+        self.eligibilities = np.zeros(self.capacity or 64)
+        self.positions = {}
+        self.length = 0
+        self.position = 0
+        self.visited = 0
+        self.skipped_updates = 0
+
+    # The number of entries with eligibility factor^k >= threshold, capped at max_length
+    @staticmethod
+    def get_capacity(trace_factor, threshold, max_length):
+        capacity = max_length
+        if threshold > 0 and trace_factor < 1:
+            if trace_factor <= 0:
+                length = 1
+            else:
+                length = int(np.floor(np.log(threshold) / np.log(trace_factor))) + 1
+            length = max(length, 1)
+            capacity = length if capacity is None else min(capacity, length)
+        return capacity
+
+    def visit(self, state, action=None):
+        """
+        Adds a state-action pair to the trace with eligibility 1: e(s,a) <- 1
+        A pair that is already in the trace only gets its eligibility reset to 1
+        """
+        entry = self.store.index(state, action)
+        position = self.positions.get(entry)
+        if position is None:
+            self.visited += 1
+            if self.capacity is None:
+                if self.length == len(self.entries):
+                    self.entries = np.concatenate([self.entries, np.zeros_like(self.entries)])
+                    self.eligibilities = np.concatenate([self.eligibilities, np.zeros_like(self.eligibilities)])
+                position = self.length
+            else:
+                position = self.position
+                if self.length == self.capacity:
+                    # The ring buffer is full, the oldest entry is dropped
+                    del self.positions[int(self.entries[position])]
+                self.position = (position + 1) % self.capacity
+            self.entries[position] = entry
+            self.positions[entry] = position
+            self.length = min(self.length + 1, self.capacity or self.length + 1)
+        self.eligibilities[position] = 1
+
+    def update(self, step):
+        """
+        Updates all entries in the trace, given step = learning rate * TD-error:
+            value <- value + step*e
+            e <- factor*e
+        """
+        entries = self.entries[:self.length]
+        eligibilities = self.eligibilities[:self.length]
+        store = self.store
+        store.values[entries] += step * eligibilities
+        store.mark_known(entries)
+        eligibilities *= self.trace_factor
+        self.skipped_updates += self.visited - self.length
+
+    def reset(self):
+        """
+        Clears the trace at the end of an episode. The skipped_updates count is kept
+        """
+        self.positions = {}
+        self.length = 0
+        self.position = 0
+        self.visited = 0
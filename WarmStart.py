@@ -0,0 +1,132 @@
+import numpy as np
+
+from StateGraph import get_state_graph
+
+
+# Values under the Critic's TD-target: V(s) = max over moves of r(s') + discount*V(s'), terminal states have value 0
+
+
+def get_graph_values(graph, discount):
+    """
+    Returns the exact value of every state of a StateGraph, by backward induction over the number of pegs
+    (every move removes one peg, so each layer only depends on the one below it)
+
+    Output:
+        numpy array, values[id] is the value of state id
+    """
+    n_moves = np.diff(graph.offsets)
+    move_states = np.repeat(np.arange(len(graph)), n_moves)
+    successors = np.asarray(graph.successors)
+    rewards = np.asarray(graph.rewards)
+    move_pegs = np.asarray(graph.remaining_pegs)[move_states]
+
+    values = np.zeros(len(graph))
+    for pegs in np.unique(move_pegs):
+        moves = move_pegs == pegs
+        layer_values = np.full(len(graph), -np.inf)
+        np.maximum.at(layer_values, move_states[moves], rewards[successors[moves]] + discount * values[successors[moves]])
+        layer_states = np.unique(move_states[moves])
+        values[layer_states] = layer_values[layer_states]
+    return values
+
+
+def get_search_values(board, reward_func, discount, max_depth):
+    """
+    Returns the values of the states up to max_depth moves from the board, by depth-first search.
+    States at the depth limit are given the value 0, so only the states closer to the start are exact
+
+    Output:
+        Dictionary {pegs: value} over the bitmasks of the non-terminal states within max_depth moves
+    """
+    start_state = board.snapshot()
+    start_pegs = start_state.get_remaining_pegs()
+    values = {}
+
+    def search(state):
+        if state.pegs in values:
+            return values[state.pegs]
+        moves = state.get_all_legal_moves()
+        if len(moves) == 0 or start_pegs - state.get_remaining_pegs() >= max_depth:
+            return 0
+        best = None
+        for (nametag, direction) in moves:
+            child = state.move_peg(nametag, direction)
+            value = reward_func(child) + discount * search(child)
+            if best is None or value > best:
+                best = value
+        values[state.pegs] = best
+        return best
+
+    search(start_state)
+    return values
+
+
+def warm_start(agent, board, reward_func, max_depth=None, epochs=50):
+    """
+    Seeds the Agent with game-theoretic values before training.
+    The table Critic gets V(s), the Actor gets r(s') + discount*V(s') - V(s) for every move (0 for the best moves),
+    and a CriticNN is fitted to V(s) with its own loss. The agent must be initialized (Agent.initialize_game)
+
+    Input:
+        agent: Agent
+        board: Start board
+        reward_func: The reward function of the game
+        max_depth: None to use the full reachable state graph (cached on disk), or the number of moves
+                   from the start to search, bounding the cost on big boards
+        epochs: Number of epochs of the CriticNN fit
+    Output:
+        Number of states seeded
+    """
+    discount = agent.discount_critic
+    start_state = board.snapshot()
+    if max_depth is None:
+        graph = get_state_graph(start_state, reward_func)
+        graph_values = get_graph_values(graph, discount)
+        values = {int(graph.pegs[state_id]): graph_values[state_id]
+                  for state_id in np.flatnonzero(~np.asarray(graph.terminal))}
+    else:
+        values = get_search_values(start_state, reward_func, discount, max_depth)
+
+    states = [type(start_state)(start_state.board_size, start_state.board_shape, pegs) for pegs in values]
+
+    if hasattr(agent.critic, 'value_of_states'):
+        for state in states:
+            agent.critic.value_of_states[agent.critic.get_key_state(state)] = values[state.pegs]
+    else:
+        encoded = agent.critic.encode_states(states)
+        targets = np.array([values[state.pegs] for state in states], dtype=np.float32)
+        agent.critic.model.fit(encoded, targets, epochs=epochs, verbose=0)
+
+    actor = agent.actor
+    for state in states:
+        key_state, transform = actor.get_key_state(state)
+        for action in state.get_all_legal_moves():
+            child = state.move_peg(action[0], action[1])
+            child_value = values.get(child.pegs, 0)
+            advantage = reward_func(child) + discount * child_value - values[state.pegs]
+            actor.state_action_values[tuple([key_state, actor.get_key_action(state, action, transform)])] = advantage
+    return len(states)
+
+
+def warm_start_graph(agent, graph):
+    """
+    Seeds a table Agent trained on a StateGraph (see StateGraph.train_on_graph), where states are graph ids
+    and actions are move indices
+
+    Output:
+        Number of states seeded
+    """
+    discount = agent.discount_critic
+    values = get_graph_values(graph, discount)
+    n_seeded = 0
+    for state_id in np.flatnonzero(~np.asarray(graph.terminal)):
+        state_id = int(state_id)
+        agent.critic.value_of_states[state_id] = values[state_id]
+        first_move = int(graph.offsets[state_id])
+        for k in range(int(graph.offsets[state_id + 1]) - first_move):
+            successor = int(graph.successors[first_move + k])
+            child_value = 0 if graph.terminal[successor] else values[successor]
+            advantage = graph.rewards[successor] + discount * child_value - values[state_id]
+            agent.actor.state_action_values[tuple([state_id, k])] = advantage
+        n_seeded += 1
+    return n_seeded
@@ -1,10 +1,18 @@
 from Agent import Agent, CriticType
-from PegSolitaire import PSBoard
+from PegSolitaire import PSBoard, PSBitBoard
 from HexGrid import Shape
-import copy
+from Solver import solve
+from Checkpoint import save_checkpoint, load_checkpoint
+from WarmStart import warm_start, warm_start_graph
+from Profiler import Profiler
+from HexVisualizer import save_gif
+from Metrics import MetricsLog, plot_metrics
+import contextlib
+import os
+from StateGraph import get_state_graph, play_graph_game, train_on_graph
 import imageio
+import random
 import time
-import matplotlib.pyplot as plt
 
 # Unpopulates all the cells in a list of cells. 
 # Used to unpopulate the cells which should be empty in the start state
@@ -14,29 +22,29 @@ def empty_cells(cells):
     return
 
 # Move peg on board. Direction is an integer representing the direction: [n, e, se, s, w, nw] = [0,1,2,3,4,5]
-# returns board in the state it's in after the peg has been moved
+# returns board in the state it's in after the peg has been moved.
+# A PSBoard is moved in place (see PSBoard.undo_move), a PSBitBoard returns a new immutable board
 def move_peg(board, peg, direction):
-    if (peg, direction) not in board.get_all_legal_moves():
-        raise ValueError("Not a legal move")
-    else:
-        board_copy = copy.deepcopy(board)
-        peg_copy = board_copy.get_cell(peg.get_nametag())
-        peg_copy.unpopulate()
-        peg_copy.neighbors[direction].unpopulate()
-        peg_copy.neighbors[direction].neighbors[direction].populate()
-        board_copy.update_remaining_pegs()
-        return board_copy
+    if isinstance(board, PSBitBoard):
+        return board.move_peg(peg, direction)
+    board.apply_move(peg, direction)
+    return board
 
 # Asks the agent for action given board state, all legal moves and whether the agent should be greedy or not.
-# Greedy action is equivalent to running the actori with epsilon=0. Returns the peg cell and direction the agent says it should be moved
-def decide_move(board, legal_moves, agent, is_greedy):
-    child_boards = []
-    # build an array of child states to feed the agent with
-    for move in legal_moves:
-        board_copy = copy.deepcopy(board)
-        child_boards.append(move_peg(board=board_copy, peg=move[0], direction=move[1]))
+# Greedy action is equivalent to running the actori with epsilon=0. Returns the peg cell and direction the agent says it should be moved.
+# The agent sees immutable snapshots of the states and actions on the form (nametag, direction).
+# With learn=False the agent only picks the move, and learns nothing from it
+def decide_move(board, legal_moves, agent, is_greedy, learn=True):
+    state = board.snapshot()
+    actions = [(peg if isinstance(peg, int) else peg.get_nametag(), direction) for (peg, direction) in legal_moves]
+    if not learn:
+        return list(agent.choose_action(state, actions, is_greedy))
+
+    # The child state is only built for the action the agent picks
+    def child_state(action):
+        return state.move_peg(action[0], action[1])
 
-    move = agent.get_action(state=board, legal_actions=legal_moves, child_states=child_boards, is_greedy=is_greedy)
+    move = agent.get_action(state=state, legal_actions=actions, child_states=child_state, is_greedy=is_greedy)
 
     cell = move[0]
     direction = move[1]
@@ -44,10 +52,10 @@ def decide_move(board, legal_moves, agent, is_greedy):
 
 # reward/reinforcement function
 def get_reward(board):
-    if board.get_remaining_pegs() == 1:
+    if board.is_win():
         # game win
         return 1000
-    elif len(board.get_all_legal_moves()) == 0:
+    elif board.is_terminal():
         # game loss
         return -100
     else:
@@ -55,22 +63,32 @@ def get_reward(board):
         return 1
 
 # run a game given a board and a agent. True/False flags for whether the 
-# game should be visualized and whether it should be greedy
-def play_game(board, agent, is_greedy, visualize):
-    board_history = [board]
-
-    while len(board.get_all_legal_moves()) > 0:
-        [peg, direction] = decide_move(board, board.get_all_legal_moves(), agent, is_greedy)
+# game should be visualized, whether it should be greedy and whether the agent learns from it
+def play_game(board, agent, is_greedy, visualize, learn=True):
+    start_state = board.snapshot()
+    board_history = [start_state]
+
+    legal_moves = board.get_all_legal_moves()
+    while len(legal_moves) > 0:
+        [peg, direction] = decide_move(board, legal_moves, agent, is_greedy, learn)
         board = move_peg(board, peg, direction)
-        board_history.append(board)
+        board_history.append(board.snapshot())
+        legal_moves = board.get_all_legal_moves()
+
+    # Boards moved in place are set back to the start, so the game leaves the input board untouched
+    if isinstance(board, PSBoard):
+        board.restore(start_state)
 
     # visualize the board by generating a gif of the game: out/solution.gif
     if visualize:
         visualize_game(board_history)
-    return board
+    return board_history[-1]
 
 
 def visualize_game(board_history):
+    if Settings.fast_visualization:
+        save_gif(board_history, 'out/solution.gif', Settings.frame_delay)
+        return
     images = []
 
     for i in range(len(board_history)):
@@ -80,39 +98,268 @@ def visualize_game(board_history):
     imageio.mimsave('out/solution.gif', images, duration=Settings.frame_delay)
 
 
-def train(board, agent):
-    agent.initialize_game(board)
+# Trains the agent on the start boards, a list of (empty cells, board) as returned by get_start_boards.
+# With several starts, the start of every episode is sampled uniformly and all of them train the same agent.
+# Every eval_every episodes each start gets a greedy evaluation, and training stops when all of them have
+# converged by the rule of is_converged
+def train(boards, agent):
+    agent.initialize_game(boards[0][1])
+    if Settings.warm_start:
+        n_seeded = sum(warm_start(agent, board, get_reward, Settings.warm_start_depth, Settings.warm_start_epochs)
+                       for (_, board) in boards)
+        print("Warm start: ", n_seeded, " states seeded")
 
     ep = []
     results = []
     start = time.time()
     episodes = Settings.episodes
-    for n in range(episodes):
-        board_copy = copy.deepcopy(board)
-        board_copy = play_game(board_copy, agent, False, False)
-        nr_pegs = board_copy.get_remaining_pegs()
-        print("Game ", n + 1, " : ", nr_pegs, " in ", time.time() - start, "s")
-        ep.append(n + 1)
-        results.append(nr_pegs)
-        agent.end_of_episode(episodes)
-
-        start = time.time()
 
+    first_episode = 0
+    if Settings.resume and os.path.exists(Settings.checkpoint_path):
+        first_episode = load_checkpoint(agent, Settings.checkpoint_path)
+        print("Resuming from episode ", first_episode, " of ", Settings.checkpoint_path)
+
+    profiler = Profiler().instrument() if Settings.profile else None
+    metrics = get_metrics_log(first_episode)
+    train_start = time.time()
+    n_played = [0] * len(boards)
+    evaluations = [[] for _ in boards]
+    try:
+        for n in range(first_episode, episodes):
+            i = random.randrange(len(boards)) if len(boards) > 1 else 0
+            (start_cells, board) = boards[i]
+            final_state = play_game(board, agent, False, False)
+            nr_pegs = final_state.get_remaining_pegs()
+            episode_time = time.time() - start
+            if len(boards) > 1:
+                print("Game ", n + 1, " from ", start_cells, " : ", nr_pegs, " in ", episode_time, "s")
+            else:
+                print("Game ", n + 1, " : ", nr_pegs, " in ", episode_time, "s")
+            n_played[i] += 1
+            ep.append(n + 1)
+            results.append(nr_pegs)
+            if metrics is not None:
+                metrics.record(agent, n + 1, nr_pegs, board.get_remaining_pegs() - nr_pegs, episode_time)
+            agent.end_of_episode(episodes)
+
+            stop = None
+            if Settings.eval_every > 0 and (n + 1) % Settings.eval_every == 0:
+                # Every start is evaluated, as learning from one start can change the greedy play of the others.
+                # The greedy games are profiled apart, so they do not inflate the timings of the training episode
+                with contextlib.nullcontext() if profiler is None else profiler.excluded('evaluation'):
+                    for j, (_, start_board) in enumerate(boards):
+                        evaluations[j].append(evaluate_greedy(start_board, agent))
+                if all(is_converged(start_evaluations) for start_evaluations in evaluations):
+                    if len(boards) > 1:
+                        stop = "greedy play converged from all " + str(len(boards)) + " starts"
+                    else:
+                        stop = "greedy play converged to " + str(evaluations[0][-1]) + " pegs"
+            if Settings.max_train_time is not None and time.time() - train_start > Settings.max_train_time:
+                stop = "time budget of " + str(Settings.max_train_time) + "s used"
+            if profiler is not None:
+                profiler.end_episode(agent)
+
+            if Settings.checkpoint_every > 0 and ((n + 1) % Settings.checkpoint_every == 0 or n + 1 == episodes
+                                                  or stop is not None):
+                save_checkpoint(agent, n + 1, Settings.checkpoint_path)
+
+            if stop is not None:
+                report_early_stop(stop, n + 1 - first_episode, episodes - first_episode, time.time() - train_start)
+                break
+
+            start = time.time()
+    finally:
+        # The buffered records are written even if training is interrupted
+        if metrics is not None:
+            metrics.close()
+
+    if len(boards) > 1:
+        report_starts(boards, agent, n_played, evaluations)
     print("Nr of victories: ", results.count(1))
+    if agent.get_skipped_updates() > 0:
+        print("Eligibility updates skipped by bounded traces: ", agent.get_skipped_updates())
+    if profiler is not None:
+        save_profile(profiler)
+
+    plot_training(ep, results)
+
+
+# Plays a greedy game without learning, and returns the number of remaining pegs.
+# Greedy play sets the epsilon of the Actor to 0, so it is set back to the one of the current episode
+def evaluate_greedy(board, agent):
+    final_state = play_game(board, agent, is_greedy=True, visualize=False, learn=False)
+    agent.actor.epsilon = agent.dynamic_epsilon
+    return final_state.get_remaining_pegs()
+
+
+# Training has converged when the last convergence_window greedy evaluations left the same number of pegs
+# (a single peg, if convergence_requires_win is set)
+def is_converged(evaluations):
+    window = evaluations[-Settings.convergence_window:]
+    if len(window) < Settings.convergence_window or len(set(window)) > 1:
+        return False
+    return window[-1] == 1 or not Settings.convergence_requires_win
+
+
+# Prints why training stopped early, and the speedup against playing all the episodes,
+# estimating the time of the full run from the mean time of the episodes played
+def report_early_stop(reason, n_played, n_budget, elapsed):
+    print("Stopped after ", n_played, " of ", n_budget, " episodes in ", round(elapsed, 3), "s: ", reason)
+    if n_played > 0:
+        print("Speedup against the full run: ", round(n_budget / n_played, 2), "x, estimated ",
+              round(elapsed * (n_budget / n_played - 1), 3), "s saved")
+
+
+# The start boards to train on, as a list of (empty cells, board): those of Settings.start_positions,
+# or the board of Settings.empty_cells. Starts without a legal move cannot be trained on and are left out
+def get_start_boards():
+    start_positions = Settings.start_positions if Settings.start_positions is not None else [Settings.empty_cells]
+    boards = []
+    for start_cells in start_positions:
+        board = get_game_board(start_cells=start_cells)
+        if board.is_terminal():
+            print("Start ", start_cells, " has no legal moves, skipping it")
+            continue
+        boards.append((start_cells, board))
+    return boards
+
+
+# Prints a line per start of multi-start training: the episodes played from it, and its last greedy result
+# and whether it has converged, when greedy evaluations were made
+def report_starts(boards, agent, n_played, evaluations):
+    for i, (start_cells, board) in enumerate(boards):
+        if len(evaluations[i]) > 0:
+            status = "converged" if is_converged(evaluations[i]) else "not converged"
+            print("Start ", start_cells, ": ", n_played[i], " episodes, greedy ", evaluations[i][-1], " pegs, ", status)
+        else:
+            print("Start ", start_cells, ": ", n_played[i], " episodes, greedy ", evaluate_greedy(board, agent), " pegs")
+    if any(len(start_evaluations) > 0 for start_evaluations in evaluations):
+        n_converged = sum(is_converged(start_evaluations) for start_evaluations in evaluations)
+        print(n_converged, " of ", len(boards), " starts converged")
+
+
+# Trains the agent on n_envs games played in lockstep. Every step, all the games pick their moves,
+# the Critic evaluates the TD-errors of all of them in one batched call, and each game learns from its own.
+# Every game keeps its own eligibility traces, and finished games restart from the start board
+def train_vectorized(board, agent, n_envs):
+    agent.initialize_game(board)
+    if Settings.warm_start:
+        n_seeded = warm_start(agent, board, get_reward, Settings.warm_start_depth, Settings.warm_start_epochs)
+        print("Warm start: ", n_seeded, " states seeded")
 
+    ep = []
+    results = []
+    start = time.time()
+    episodes = Settings.episodes
+    start_state = board.snapshot()
+    if start_state.is_terminal():
+        return
+
+    profiler = Profiler().instrument() if Settings.profile else None
+    metrics = get_metrics_log()
+    start_pegs = start_state.get_remaining_pegs()
+    n_envs = min(n_envs, episodes)
+    states = [start_state] * n_envs
+    env_episodes = [agent.new_episode() for _ in range(n_envs)]
+    started = n_envs
+
+    while len(states) > 0:
+        actions = []
+        next_states = []
+        rewards = []
+        for k in range(len(states)):
+            agent.set_episode(env_episodes[k])
+            action = agent.choose_action(states[k], states[k].get_all_legal_moves(), is_greedy=False)
+            next_state = states[k].move_peg(action[0], action[1])
+            actions.append(action)
+            next_states.append(next_state)
+            rewards.append(get_reward(next_state))
+
+        td_errors = agent.critic.get_td_errors(states, next_states, rewards)
+
+        for k in range(len(states) - 1, -1, -1):
+            agent.set_episode(env_episodes[k])
+            agent.learn(states[k], actions[k], td_errors[k])
+
+            if not next_states[k].is_terminal():
+                states[k] = next_states[k]
+                continue
+
+            # The game is finished
+            nr_pegs = next_states[k].get_remaining_pegs()
+            results.append(nr_pegs)
+            ep.append(len(results))
+            print("Game ", len(results), " : ", nr_pegs, " in ", time.time() - start, "s")
+            if metrics is not None:
+                # With several games in lockstep, the time and TD-errors are those since the previous game finished
+                metrics.record(agent, len(results), nr_pegs, start_pegs - nr_pegs, time.time() - start)
+            agent.end_of_episode(episodes)
+            if profiler is not None:
+                # With several games in lockstep, a row covers the time since the previous game finished
+                profiler.end_episode(agent)
+
+            if started < episodes:
+                states[k] = start_state
+                env_episodes[k] = agent.new_episode()
+                started += 1
+            else:
+                del states[k]
+                del env_episodes[k]
+
+    agent.set_episode(agent.new_episode())
+    if metrics is not None:
+        metrics.close()
+    print("Nr of victories: ", results.count(1), " in ", time.time() - start, "s")
+    if profiler is not None:
+        save_profile(profiler)
+
+    plot_training(ep, results)
+
+
+# Stops the profiler, prints the breakdown of the training time and writes it to Settings.profile_path (.csv and .json)
+def save_profile(profiler):
+    profiler.remove()
+    print(profiler.report())
+    profiler.save_csv(Settings.profile_path + '.csv')
+    profiler.save_json(Settings.profile_path + '.json')
+
+
+# Metrics log of the training run at Settings.metrics_path (None when it is not set), continuing after
+# first_episode episodes when resuming
+def get_metrics_log(first_episode=0):
+    if Settings.metrics_path is None:
+        return None
+    return MetricsLog(Settings.metrics_path, Settings.metrics_flush_every, first_episode)
+
+
+# Writes out/plot.png, from the metrics log when there is one
+def plot_training(ep, results):
+    if Settings.metrics_path is not None:
+        plot_metrics(Settings.metrics_path, 'out/plot.png')
+    else:
+        plot_results(ep, results)
+
+
+def plot_results(ep, results):
+    import matplotlib.pyplot as plt
     plt.bar(ep, results)
     plt.xlabel('Episode')
     plt.ylabel('Nr of remaining pegs')
     plt.savefig('out/plot.png')
 
 
-def get_agent():
-    return Agent(Settings(), reward_func=get_reward)
+# settings defaults to the Settings class, but can be any object with the same fields
+def get_agent(settings=None):
+    return Agent(settings or Settings(), reward_func=get_reward)
 
-def get_game_board():
-    b = PSBoard(board_size=Settings.board_size, board_shape=Settings.board_shape)
-    for cell in Settings.empty_cells:
+def get_game_board(settings=None, start_cells=None):
+    settings = settings or Settings
+    b = PSBoard(board_size=settings.board_size, board_shape=settings.board_shape)
+    for cell in start_cells if start_cells is not None else settings.empty_cells:
         empty_cells([b.board[cell[0], cell[1]]])
+    b.update_remaining_pegs()
+    if settings.use_bitboard:
+        return PSBitBoard.from_board(b)
     return b
 
 class Settings:
@@ -120,7 +367,7 @@ class Settings:
     Input parameters for the simulation of the game
     """
 
-    #Critic type either .TABLE or .NN
+    #Critic type either .TABLE, .NN or .NN_NUMPY (the NN Critic on NumPy, optimizer must be 'SGD')
     critic_type=CriticType.NN
 
     epsilon=0.99
@@ -135,25 +382,155 @@ class Settings:
     discount_critic=0.9
     decay_critic=0.9 #The eligibility trace-decay
 
-    #Parameters for the Neural Net used by the .NN Critic
+    # Bounded eligibility traces: drop entries with eligibility below the threshold (0 keeps all),
+    # or beyond a maximum trace length (None for no limit)
+    trace_threshold=0
+    trace_max_length=None
+
+    #Parameters for the Neural Net used by the .NN and .NN_NUMPY Critics
     nn_shape=[15, 1]
     activation_func='relu'
     optimizer='SGD'
+    nn_compiled_update=True # Run the end of episode update of the Neural Net as one compiled graph call
+
+    # Share the Actor and table Critic values between symmetric board positions (requires use_bitboard)
+    use_symmetry=False
 
     episodes=2000
     frame_delay = 0.5
+    # Render the solution gif in memory, redrawing only the cells that change between frames,
+    # instead of writing every frame to out/img*.png
+    fast_visualization=True
+
+    # Write a checkpoint of the agent every checkpoint_every episodes (0 for never),
+    # and continue from the checkpoint at checkpoint_path if resume is set.
+    # Only for the sequential training loop, not with n_envs > 1 or use_state_graph (see check_settings)
+    checkpoint_every=0
+    checkpoint_path='out/checkpoint.npz'
+    resume=False
+
+    # Solve the start position exactly before training. Unsolvable starts are not trained on,
+    # and the greedy result is compared with the optimal one. The solver gives up after solver_max_nodes
+    # positions or solver_max_time seconds (None for no limit), and starts it could not decide are trained on
+    check_solvable=False
+    solver_max_nodes=1000000
+    solver_max_time=10
+
+    # Seed the Actor and Critic with the exact values of the game before training (see WarmStart.py).
+    # warm_start_depth limits the search to the first moves from the start (None searches every reachable state),
+    # and warm_start_epochs is the length of the supervised fit of the .NN Critic
+    warm_start=False
+    warm_start_depth=None
+    warm_start_epochs=50
+
+    # Per-episode metrics are appended to the columnar log in metrics_path (None for no log), in batches
+    # of metrics_flush_every episodes. Plot it during training with: python Metrics.py out/metrics
+    metrics_path='out/metrics'
+    metrics_flush_every=100
+
+    # Time the hot paths of training (see Profiler.py) and write per-episode and total breakdowns to
+    # profile_path.csv and profile_path.json. Costs nothing when not set
+    profile=False
+    profile_path='out/profile'
+
+    # Early stopping: every eval_every episodes (0 for never) a greedy game is played without learning,
+    # and training stops when the last convergence_window of them left the same number of pegs
+    # (only a single peg counts if convergence_requires_win). max_train_time is a wall-clock budget in seconds
+    # (None for no limit). Only for the sequential training loop, not with n_envs > 1 or use_state_graph (see check_settings)
+    eval_every=0
+    convergence_window=10
+    convergence_requires_win=True
+    max_train_time=None
+
+    # Multi-start training: a list of start positions, each a list of empty cells like empty_cells.
+    # Every episode starts from one of them, sampled uniformly, and all of them train the same Actor and Critic.
+    # With eval_every > 0, training stops when every start has converged. None trains on empty_cells only.
+    # Only for the sequential training loop, not with n_envs > 1 or use_state_graph
+    start_positions=None
+
+    # Train on the precomputed graph of all reachable states (cached in out/graphs) instead of on boards.
+    # Only for small boards (triangle <= 6, diamond <= 5) and the TABLE critic without use_symmetry (see check_settings)
+    use_state_graph=False
+
+    # Number of games played in lockstep during training, with batched Critic evaluations (1 plays one at a time)
+    n_envs=1
 
     # Board format:
     # (Shape either .TRIANGLE or .DIAMOND)
     empty_cells=[(2,2)]
     board_shape = Shape.DIAMOND
     board_size = 4
+    # Use the compact bitboard engine (PSBitBoard) instead of the cell graph (PSBoard)
+    use_bitboard = True
+
+# Raises a ValueError for Settings that the chosen training loop would silently ignore or cannot run.
+# Multiple starts, early stopping, time budgets and checkpoints are only supported by the sequential loop (train)
+def check_settings(settings=None):
+    settings = settings or Settings
+    if settings.start_positions is not None and (settings.use_state_graph or settings.n_envs > 1):
+        raise ValueError("start_positions can only be used with the sequential training loop, "
+                         "not with use_state_graph or n_envs > 1")
+    # Graph states are integer ids, which only the table Critic can key on, and which cannot be canonicalized
+    if settings.use_state_graph and (settings.critic_type != CriticType.TABLE or settings.use_symmetry):
+        raise ValueError("use_state_graph requires critic_type=CriticType.TABLE and use_symmetry=False")
+    if settings.use_state_graph:
+        loop = "use_state_graph"
+    elif settings.n_envs > 1:
+        loop = "n_envs > 1"
+    else:
+        return
+    unsupported = [name for (name, is_set) in (('eval_every', settings.eval_every > 0),
+                                               ('max_train_time', settings.max_train_time is not None),
+                                               ('checkpoint_every', settings.checkpoint_every > 0),
+                                               ('resume', settings.resume)) if is_set]
+    if len(unsupported) > 0:
+        raise ValueError(f"{', '.join(unsupported)} cannot be used with {loop}, only with the sequential training loop")
+
 
 def main():
+    check_settings()
     agent = get_agent()
-    board = get_game_board()
-    train(board=board, agent=agent)
-    play_game(board, agent, is_greedy=True, visualize=True)
+    boards = get_start_boards()
+    solutions = []
+    if Settings.check_solvable:
+        solvable_boards = []
+        for (start_cells, board) in boards:
+            solution = solve(board, max_nodes=Settings.solver_max_nodes, max_time=Settings.solver_max_time)
+            print("Solver ", start_cells, ": ", solution)
+            if not solution.complete:
+                print("Start ", start_cells, " could not be solved within the solver budget, training on it anyway")
+            elif not solution.solvable:
+                print("Start ", start_cells, " cannot be solved, skipping it")
+                continue
+            solvable_boards.append((start_cells, board))
+            solutions.append(solution)
+        boards = solvable_boards
+    if len(boards) == 0:
+        print("No start position can be trained on, skipping training")
+        return
+
+    if Settings.use_state_graph:
+        graph = get_state_graph(boards[0][1], get_reward)
+        if Settings.warm_start:
+            print("Warm start: ", warm_start_graph(agent, graph), " states seeded")
+        results = train_on_graph(graph, agent, Settings.episodes)
+        print("Nr of victories: ", results.count(1))
+        plot_results(list(range(1, len(results) + 1)), results)
+        history = play_graph_game(graph, agent, is_greedy=True, learn=False)
+        visualize_game([graph.get_state(state) for state in history])
+        return
+    if Settings.n_envs > 1:
+        train_vectorized(board=boards[0][1], agent=agent, n_envs=Settings.n_envs)
+    else:
+        train(boards=boards, agent=agent)
+
+    # The greedy game from the first start is visualized, the others are only played to compare with the solver
+    final_states = [play_game(boards[0][1], agent, is_greedy=True, visualize=True)]
+    if Settings.check_solvable:
+        final_states += [play_game(board, agent, is_greedy=True, visualize=False) for (_, board) in boards[1:]]
+        for ((start_cells, _), final_state, solution) in zip(boards, final_states, solutions):
+            print("Greedy play from ", start_cells, ": ", final_state.get_remaining_pegs(), " pegs left, optimal: ",
+                  solution.best_pegs if solution.complete else "unknown")
 
 
 if __name__ == '__main__':